@@ -0,0 +1,92 @@
+from collections import OrderedDict
+import threading
+import pandas as pd
+import constants as const
+import serialization
+import table
+import trends
+
+# Cubes of the most recent data versions, so every callback for a version shares one
+__cubes = OrderedDict()
+__cubesLock = threading.Lock()
+__stats = dict(hits=0, misses=0)
+
+
+class AggregateCube:
+    '''Holds every slice of the data the callbacks need, computed once per data
+    version. Daily and cumulative cases are indexed by (location, occupation, date).'''
+
+    def __init__(self, df, version=None):
+        '''df is a canonical data frame, see data.normalize'''
+        self.version = version
+        self.table = table.TableIndex(df)
+        daily = df.groupby(['locations', 'occupations', 'dates'], observed=True)['cases'].sum()
+        self.daily = daily.to_frame()
+        self.daily['cumulative'] = daily.groupby(level=['locations', 'occupations'], observed=True).cumsum()
+
+        byLocation = daily.groupby(level=['locations', 'dates'], observed=True).sum()
+        self.__locationDaily = {
+            location: frame.droplevel('locations').reset_index()
+            for location, frame in byLocation.groupby(level='locations', observed=True)
+        }
+        self.__occupationDaily = {
+            key: frame.droplevel(['locations', 'occupations']).reset_index()
+            for key, frame in daily.groupby(level=['locations', 'occupations'], observed=True)
+        }
+        self.__totals = byLocation.groupby(level='locations', observed=True).sum().to_dict()
+        # Rows are unique per date, so the mean of the rows is the daily average
+        self.__averages = df.groupby(['locations', 'occupations'], observed=True)['cases'].mean().to_dict()
+        self.trends = trends.compute(daily)
+
+    def location_daily(self, location):
+        '''Returns the daily cases of a location with dates and cases columns'''
+        return self.__locationDaily.get(location, pd.DataFrame(columns=['dates', 'cases']))
+
+    def occupation_daily(self, location, occupation):
+        '''Returns the daily cases of an occupation on a location with dates and
+        cases columns'''
+        return self.__occupationDaily.get((location, occupation),
+                                          pd.DataFrame(columns=['dates', 'cases']))
+
+    def total(self, location):
+        '''Returns the total number of cases of a location'''
+        return int(self.__totals.get(location, 0))
+
+    def average(self, location, occupation):
+        '''Returns the daily average of an occupation on a location, NaN when the
+        occupation has no rows there'''
+        return self.__averages.get((location, occupation), float('nan'))
+
+    def trend(self, location, occupation=trends.ALL):
+        '''Returns the growth, averages and doubling times of an occupation on a
+        location, or of the whole location, as a dict (see trends.compute)'''
+        return self.trends.loc[(location, occupation)].to_dict()
+
+
+def get_cube(store):
+    '''Returns the aggregate cube for a dataset encoded by serialization.encode.
+    The dataset is only decoded the first time its version is seen. Cubes are
+    shared by every request, so a dataset whose content does not match its
+    version is refused.'''
+    version = store['version']
+    with __cubesLock:
+        if version in __cubes:
+            __stats['hits'] += 1
+            __cubes.move_to_end(version)
+            return __cubes[version]
+        __stats['misses'] += 1
+    df = serialization.decode(store)
+    if serialization.get_version(df) != version:
+        raise ValueError(f'The dataset does not match its version {version}')
+    cube = AggregateCube(df, version)
+    with __cubesLock:
+        __cubes[version] = cube
+        while len(__cubes) > const.CUBE_VERSIONS:
+            __cubes.popitem(last=False)
+    return cube
+
+
+def cache_info():
+    '''Returns the number of cube hits, misses and stored cubes'''
+    with __cubesLock:
+        return dict(__stats, size=len(__cubes))
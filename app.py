@@ -3,16 +3,28 @@ import dash_bootstrap_components as dbc
 import dash_html_components as html
 import dash_core_components as dcc
 from flask_caching import Cache
+from flask_compress import Compress
 import layouts
-import data
-from dash.dependencies import Input, Output, State
+from dash.dependencies import Input, Output, State, ClientsideFunction
 from dash.exceptions import PreventUpdate
 import graphGenerator as gg
-from datetime import datetime, timedelta
 import helper_functions as hf
+import flask
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-import pandas as pd
+import constants as const
+import serialization
+import database
+import aggregates
+import memoize
+import downsample
+import compact
+import sources
+from refresher import Refresher
+import delivery
+import metrics
+import time
+from datetime import date
 
 server = Flask(__name__)
 
@@ -39,14 +51,149 @@ app._favicon = '/assets/favicon.ico'
 app.server.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.server.config['SQLALCHEMY_DATABASE_URI'] = 'Postgres URI'
 db = SQLAlchemy(app.server)
+predictions = database.PredictionCache(lambda: db.engine)
 
-app.layout = html.Div([
-    dcc.Location(id='url', refresh=False), layouts.navbar,
-    dcc.Store(id='data', data=data.__get_data().to_json()),
-    html.Div(layouts.USFLayout, id='page-content'), layouts.footer
-])
+# Callback metrics at /metrics
+metrics.init_app(app.server)
+
+# Brotli or gzip compressed responses. Registered after the metrics so the
+# response sizes in the metrics are the compressed ones.
+Compress(app.server)
+
+# Flask-Caching
+# The filesystem backend is shared by every gunicorn worker on the dyno, so the
+# USF page is scraped once per timeout instead of once per worker.
+cache = Cache(app.server, config={
+    'CACHE_TYPE': 'filesystem',
+    'CACHE_DIR': const.CACHE_DIR,
+    'CACHE_DEFAULT_TIMEOUT': const.CACHE_TIMEOUT,
+    'CACHE_THRESHOLD': const.CACHE_THRESHOLD,
+})
+
+
+datasetStats = dict(hits=0, misses=0)
+
+
+def build_dataset():
+    '''Reads the cases stored by the scheduler, scraping the sources while the table
+    is still empty, and returns them encoded for the data store. The result is
+    shared with the other workers through the cache and its cube is built before
+    a callback asks for it.'''
+    df = database.read_covid_data(db.engine)
+    # The table is empty until the scheduler stored its first scrape
+    if df.empty:
+        df = sources.fetch_all()[0]
+    return store_dataset(df)
+
+
+def refresh_dataset():
+    '''Rebuilds the dataset from the database in the refresher thread. While the
+    table is empty the workers share the cached dataset, which only one of them
+    scrapes, instead of each scraping the sources every interval.'''
+    df = database.read_covid_data(db.engine)
+    if df.empty:
+        return load_dataset()
+    return store_dataset(df)
+
+
+def store_dataset(df):
+    '''Encodes the data frame, shares it through the cache and builds its cube'''
+    dataset = serialization.encode(df)
+    cache.set(const.DATASET_CACHE_KEY, dataset)
+    aggregates.get_cube(dataset)
+    return dataset
+
+
+def load_dataset():
+    '''Returns the dataset from the cache, only one worker builds it when the
+    cache is empty'''
+    dataset = cache.get(const.DATASET_CACHE_KEY)
+    if dataset is not None:
+        return dataset
+
+    # cache.add only succeeds for the first worker, the rest wait for its result
+    if not cache.add(const.DATASET_LOCK_KEY, True, timeout=const.DATASET_LOCK_TIMEOUT):
+        deadline = time.monotonic() + const.DATASET_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(0.5)
+            dataset = cache.get(const.DATASET_CACHE_KEY)
+            if dataset is not None:
+                return dataset
+
+    try:
+        return build_dataset()
+    finally:
+        cache.delete(const.DATASET_LOCK_KEY)
+
+
+# Stale-while-revalidate: requests get the last good dataset while the refresher
+# thread rebuilds it in the background
+refresher = Refresher(refresh_dataset, onError=lambda e: metrics.count_exception('refresher', e))
+
+
+def get_dataset():
+    '''Returns the last good dataset encoded for the data store. Only the first
+    request of a worker waits for it to be loaded.'''
+    dataset = refresher.get()
+    if dataset is not None:
+        datasetStats['hits'] += 1
+    else:
+        datasetStats['misses'] += 1
+        dataset = load_dataset()
+        refresher.set(dataset)
+    refresher.start()
+    return dataset
+
+
+def get_cube():
+    '''Returns the aggregate cube of the current dataset. Callbacks only get the
+    data version from the browser, the data itself never comes from the client.'''
+    return aggregates.get_cube(get_dataset())
+
+
+@server.route('/refresh', methods=['GET', 'POST'])
+def refresh():
+    '''POST asks the refresher to rebuild the dataset now, both return its status'''
+    requested = refresher.refresh() if flask.request.method == 'POST' else False
+    return flask.jsonify(requested=requested, **refresher.status()), 202 if requested else 200
+
+
+# The dataset of a version is served at /data/<version>. The url changes with the
+# content, so browsers and proxies keep it until the data changes.
+@server.route('/data')
+def latest_data():
+    '''The current dataset, browsers check the ETag on every use'''
+    dataset = get_dataset()
+    return delivery.versioned_response('data', dataset['version'], lambda: dataset,
+                                       const.REVALIDATE_CACHE_CONTROL)
+
+
+@server.route('/data/<version>')
+def versioned_data(version):
+    '''The dataset of a version, requests for an old version are redirected to the
+    current one'''
+    dataset = get_dataset()
+    if version != dataset['version']:
+        return flask.redirect(flask.url_for('versioned_data', version=dataset['version']))
+    return delivery.versioned_response('data', version, lambda: dataset,
+                                       const.IMMUTABLE_CACHE_CONTROL)
+
+
+def serve_layout():
+    '''Builds the layout on every page load so pages get the version of the last snapshot'''
+    return html.Div([
+        dcc.Location(id='url', refresh=False), layouts.navbar,
+        # Only the version is sent with the layout, it triggers the callbacks when
+        # a page load finds new data. They read the data from the server snapshot.
+        dcc.Store(id='data-version', data=get_dataset()['version']),
+        html.Div(layouts.USFLayout, id='page-content'), layouts.footer
+    ])
+
+
+app.layout = serve_layout
 
 @app.callback(Output('page-content', 'children'), [Input('url', 'pathname')])
+@metrics.instrument('page')
 def page(pathname):
     if pathname == '/table-header':
         return layouts.table_layout
@@ -54,14 +201,21 @@ def page(pathname):
         return layouts.USFLayout
 
 
-@app.callback([Output('table', 'columns'),
-               Output('table', 'data')], [Input('data', 'data')])
-def updateDataTable(data):
+@app.callback([Output('table', 'data'),
+               Output('table', 'page_count')],
+              [Input('data-version', 'data'),
+               Input('table', 'page_current'),
+               Input('table', 'page_size'),
+               Input('table', 'sort_by'),
+               Input('table', 'filter_query')])
+@metrics.instrument('updateDataTable')
+def updateDataTable(version, pageCurrent, pageSize, sortBy, filterQuery):
+    '''Returns only the requested page of the table, sorted and filtered on the server'''
     try:
-        df = hf.string_to_df(data).iloc[::-1]
-        data_table = hf.generate_data_table_information(df)
-        return data_table[0], data_table[1]
-    except:
+        return get_cube().table.page(
+            pageCurrent or 0, pageSize or const.TABLE_PAGE_SIZE, sortBy, filterQuery)
+    except Exception as e:
+        metrics.count_exception('updateDataTable', e)
         raise PreventUpdate
 
 
@@ -74,99 +228,177 @@ def updateDataTable(data):
     Output('st-pete-card-update', 'children'),
     Output('sarasota-card-totalcases', 'children'),
     Output('sarasota-card-update', 'children'),
-], [Input('data', 'data')])
-def updateCards(data):
+    Output('tampa-card-trend', 'children'),
+    Output('st-pete-card-trend', 'children'),
+    Output('tampa-card-health-trend', 'children'),
+    Output('sarasota-card-trend', 'children'),
+], [Input('data-version', 'data')])
+@metrics.instrument('updateCards')
+def updateCards(version):
     try:
-        df = hf.string_to_df(data)
-
-        # Get for each location
-        dfByLocation = hf.get_df_by_location(df)
+        cube = get_cube()
 
         # Get total cases for each location
-        totalCasesTampa, totalCasesStPete, totalCasesHealth, totalCasesSarasota = hf.get_total_cases_by_location(
-            dfByLocation)
+        totalCasesTampa, totalCasesStPete, totalCasesHealth, totalCasesSarasota = [
+            str(cube.total(location)) for location in const.LOCATION_NAMES]
 
         # Get daily cases for each location
-        dailyCasesTampa, dailyCasesStPete, dailyCasesHealth, dailyCasesSarasota = hf.get_daily_cases_by_location(
-            dfByLocation)
+        dailyCasesTampa, dailyCasesStPete, dailyCasesHealth, dailyCasesSarasota = [
+            cube.location_daily(location) for location in const.LOCATION_NAMES]
 
         return totalCasesTampa + ' cases', totalCasesHealth + ' cases',totalCasesStPete + ' cases',\
             hf.create_daily_cases_string(dailyCasesTampa), hf.create_daily_cases_string(dailyCasesHealth),\
             hf.create_daily_cases_string(dailyCasesStPete), totalCasesSarasota + ' cases',\
-            hf.create_daily_cases_string(dailyCasesSarasota)
+            hf.create_daily_cases_string(dailyCasesSarasota), *[
+                hf.create_card_trend_string(cube.trend(location)) for location in const.LOCATION_NAMES]
             
     except Exception as e:
         print('updateCards: ', e)
+        metrics.count_exception('updateCards', e)
         raise PreventUpdate
 
 
 @app.callback([
-    Output('daily-bar-graph', 'figure'),
-    Output('total-scatter-graph', 'figure')
-], [Input('data', 'data'),
-    Input('graph_type','value')])
-def create_general_graphs(data, graphType):
-    df = hf.string_to_df(data)
-    prediction_df = pd.read_sql_table('prediction', con=db.engine)
-    df['dates'] = df['dates'].apply(lambda date: datetime.strptime(date, "%B %d %Y"))
+    Output('daily-bar-graph-figure', 'data'),
+    Output('total-scatter-graph-figure', 'data')
+], [Input('data-version', 'data'),
+    Input('daily-bar-graph', 'relayoutData')])
+@metrics.instrument('create_general_graphs')
+def create_general_graphs(version, relayoutData):
+    cube = get_cube()
+    # Zooming only rebuilds the bar graph with full resolution in the new range
+    if triggered_by('daily-bar-graph.relayoutData'):
+        window = downsample.get_window(relayoutData)
+        if window is False:
+            raise PreventUpdate
+        return daily_bar_figure(cube, date.today(), window), dash.no_update
+    return daily_bar_figure(cube, date.today()), total_scatter_figure(cube, get_prediction_version())
+
+
+def get_prediction_version():
+    '''Returns the current prediction run, None when the predictions cannot be read'''
+    try:
+        return predictions.get_version()
+    except Exception as e:
+        # The actual cases are still shown when the predictions cannot be read
+        print('get_prediction_version: ', e)
+        metrics.count_exception('predictions', e)
+        return None
 
-    location_list = hf.get_daily_cases_by_location(hf.get_df_by_location(df))
-    prediction_list = hf.get_prediction_by_location(prediction_df)
 
-    return dict(data=gg.generate_daily_bar_graph(location_list),
-                layout=gg.generate_bar_layout('Daily Cases on USF Campuses', 'group')), \
-           dict(data=gg.generate_total_scatter(graphType, location_list, prediction_list),
-                layout=gg.general_graph_layout('Total Cases USF Campuses'))
+def triggered_by(propId):
+    '''Returns whether propId is the only input that triggered the current callback'''
+    return flask.has_request_context() and \
+        [trigger['prop_id'] for trigger in dash.callback_context.triggered] == [propId]
 
 
-@app.callback(
+# The default range of the bar graphs ends today, so the day is part of the
+# memoized arguments of the figures that hold one
+@memoize.versioned_lru_cache()
+def daily_bar_figure(cube, today, window=None):
+    location_list = [cube.location_daily(location) for location in const.LOCATION_NAMES]
+    layout = gg.generate_bar_layout('Daily Cases on USF Campuses', 'group', today)
+    return compact.encode_figure(dict(
+        data=gg.generate_daily_bar_graph(location_list, downsample.apply_window(layout, window)),
+        layout=layout))
+
+
+@memoize.versioned_lru_cache()
+def total_scatter_figure(cube, predictionVersion):
+    '''Returns the figure with the actual and the prediction traces, the graph_type
+    radio only switches their visibility in the browser'''
+    location_list = [cube.location_daily(location) for location in const.LOCATION_NAMES]
+    prediction_list = []
+    if predictionVersion is not None:
+        prediction_list = hf.get_prediction_by_location(predictions.get_frame())
+    return compact.encode_figure(dict(data=gg.generate_total_scatter(location_list, prediction_list),
+                                      layout=gg.general_graph_layout('Total Cases USF Campuses')))
+
+
+# Clientside callbacks, the functions are defined in assets/clientside.js
+# Figures are sent in the compact encoding to a store next to their graph
+for graphId in ['daily-bar-graph', 'employee-student-daily-graph', 'employee-student-box',
+                'employee-student-pie', 'employee-student-total-graph']:
+    app.clientside_callback(
+        ClientsideFunction(namespace='figures', function_name='decode'),
+        Output(graphId, 'figure'),
+        [Input(graphId + '-figure', 'data')],
+    )
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace='figures', function_name='select_graph_type'),
+    Output('total-scatter-graph', 'figure'),
+    [Input('total-scatter-graph-figure', 'data'),
+     Input('graph_type', 'value')],
+)
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='toggle_collapse'),
     Output("collapse", "is_open"),
     [Input("collapse-button", "n_clicks")],
     [State("collapse", "is_open")],
 )
-def toggle_collapse(n, is_open):
-    if n:
-        return not is_open
-    return is_open
 
 
 @app.callback([
-    Output('employee-student-daily-graph', 'figure'),
-    Output('employee-student-box', 'figure'),
-    Output('employee-student-pie', 'figure'),
-    Output('employee-student-total-graph', 'figure'),
+    Output('employee-student-daily-graph-figure', 'data'),
+    Output('employee-student-box-figure', 'data'),
+    Output('employee-student-pie-figure', 'data'),
+    Output('employee-student-total-graph-figure', 'data'),
     Output('general-overview', 'children'),
     Output('general-daily-average', 'children'),
     Output('collapse-text', 'children')
-], [Input('data', 'data'),
-    Input('general-tabs', 'active_tab')])
-def campus_graphs(data, active_tab):
+], [Input('data-version', 'data'),
+    Input('general-tabs', 'active_tab'),
+    Input('employee-student-daily-graph', 'relayoutData')])
+@metrics.instrument('campus_graphs')
+def campus_graphs(version, active_tab, relayoutData):
     try:
-        # Converting string to data frame
-        return tab_content(hf.string_to_df(data), active_tab)
+        cube = get_cube()
+        if triggered_by('employee-student-daily-graph.relayoutData'):
+            window = downsample.get_window(relayoutData)
+            if window is False:
+                raise PreventUpdate
+            return [occupation_daily_figure(cube, active_tab, date.today(), window)] + [dash.no_update] * 6
+        return tab_content(cube, active_tab, date.today())
 
+    except PreventUpdate:
+        raise
     except Exception as e:
         print('Campus Graph: ', e)
+        metrics.count_exception('campus_graphs', e)
         raise PreventUpdate
 
 
-def tab_content(df, active_tab):
-    new_df = df[df['locations'] == active_tab]
-    new_df['dates'] = new_df['dates'].apply(
-        lambda date: datetime.strptime(date, '%B %d %Y'))
-    employeeAvg, studentAvg = hf.get_daily_average(new_df)
-    result, status, mostRecent, lastValue = hf.get_percent(new_df)
-    occupationList = hf.get_df_by_occupation(new_df)
-    student = new_df[new_df['occupations'] == 'Student']
-    employee = new_df[new_df['occupations'] == 'Employee']
-    return dict(data = gg.generate_employee_student_daily_graph(occupationList), layout = gg.generate_bar_layout(f'Student Vs. Employee Daily Cases (USF {active_tab})', 'stack')),\
-        dict(data = gg.generate_box_plot(occupationList), layout = gg.general_graph_layout(f'Box Plot For Daily Cases Per Occupation (USF {active_tab})')),\
-        dict(data = gg.generate_pie_plot(occupationList), layout = gg.general_graph_layout(f'Total Cases Percentage Per Occupation (USF {active_tab})')),\
-        dict(data = gg.generate_employee_student_total_graph(occupationList), layout = gg.general_graph_layout(f'Student Vs. Employee Total Cases (USF {active_tab})')),\
-        f'The USF {active_tab} has seen a {result:.2%} {status} in cases in the last two weeks. The number of cases went from {lastValue} to {mostRecent}.',\
+@memoize.versioned_lru_cache()
+def occupation_daily_figure(cube, active_tab, today, window=None):
+    occupationList = [cube.occupation_daily(active_tab, occupation) for occupation in const.OCCUPATION_NAMES]
+    layout = gg.generate_bar_layout(f'Student Vs. Employee Daily Cases (USF {active_tab})', 'stack', today)
+    return compact.encode_figure(dict(
+        data=gg.generate_employee_student_daily_graph(occupationList, downsample.apply_window(layout, window)),
+        layout=layout))
+
+
+@memoize.versioned_lru_cache()
+def tab_content(cube, active_tab, today):
+    employeeAvg = cube.average(active_tab, 'Employee')
+    studentAvg = cube.average(active_tab, 'Student')
+    occupationList = [cube.occupation_daily(active_tab, occupation) for occupation in const.OCCUPATION_NAMES]
+    return occupation_daily_figure(cube, active_tab, today),\
+        compact.encode_figure(dict(data = gg.generate_box_plot(occupationList), layout = gg.general_graph_layout(f'Box Plot For Daily Cases Per Occupation (USF {active_tab})'))),\
+        compact.encode_figure(dict(data = gg.generate_pie_plot(occupationList), layout = gg.general_graph_layout(f'Total Cases Percentage Per Occupation (USF {active_tab})'))),\
+        compact.encode_figure(dict(data = gg.generate_employee_student_total_graph(occupationList), layout = gg.general_graph_layout(f'Student Vs. Employee Total Cases (USF {active_tab})'))),\
+        hf.create_trend_string(cube.trend(active_tab), active_tab),\
         hf.create_avg_string(employeeAvg, studentAvg, active_tab), hf.generate_collapse(active_tab)
 
 
+metrics.register_cache('dataset', lambda: datasetStats)
+metrics.register_cache('cube', aggregates.cache_info)
+for function in [daily_bar_figure, total_scatter_figure, occupation_daily_figure, tab_content]:
+    metrics.register_cache(function.__name__, function.cache_info)
+
 app.scripts.config.serve_locally = False
 app.scripts.append_script({
     'external_url':
@@ -0,0 +1,69 @@
+from datetime import datetime
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+import constants as const
+
+# Archive of every fetched page. Pages are stored gzipped under the sha256 of their
+# content, so identical fetches are stored once, and index.jsonl lists the
+# snapshots of every url in the order they were first fetched:
+#   <ARCHIVE_DIR>/objects/ab/cdef....gz
+#   <ARCHIVE_DIR>/index.jsonl
+
+__lock = threading.Lock()
+# url -> hash of the last snapshot written to the index by this process
+__lastHashes = {}
+
+
+def __object_path(digest, directory):
+    return os.path.join(directory, 'objects', digest[:2], digest[2:] + '.gz')
+
+
+def store(url, content, fetched=None, directory=const.ARCHIVE_DIR):
+    '''Adds the content of a fetched page to the archive and returns its hash'''
+    digest = hashlib.sha256(content).hexdigest()
+    path = __object_path(digest, directory)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written to a temporary file first so other workers never read half a page
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(handle, 'wb') as output:
+            output.write(gzip.compress(content, const.GZIP_LEVEL))
+        os.replace(temporary, path)
+
+    with __lock:
+        if __lastHashes.get(url) != digest:
+            __lastHashes[url] = digest
+            entry = dict(hash=digest, url=url, bytes=len(content),
+                         fetched=(fetched or datetime.now()).isoformat())
+            with open(os.path.join(directory, 'index.jsonl'), 'a') as index:
+                index.write(json.dumps(entry) + '\n')
+    return digest
+
+
+def snapshots(url=None, directory=const.ARCHIVE_DIR):
+    '''Returns the index entries of the distinct snapshots of a url, or of every
+    url, oldest first'''
+    path = os.path.join(directory, 'index.jsonl')
+    if not os.path.exists(path):
+        return []
+    entries = {}
+    with open(path) as index:
+        for line in index:
+            entry = json.loads(line)
+            if url is None or entry['url'] == url:
+                # The first fetch of a content is when it was published
+                entries.setdefault(entry['hash'], entry)
+    return list(entries.values())
+
+
+def read(digest, directory=const.ARCHIVE_DIR):
+    '''Returns the content of a snapshot. The file is memory mapped, so it is
+    decompressed without being read into a buffer first.'''
+    with open(__object_path(digest, directory), 'rb') as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return gzip.decompress(mapped)
@@ -0,0 +1,75 @@
+// Clientside callbacks registered in app.py
+(function () {
+    var TYPED_ARRAYS = {
+        i1: Int8Array, u1: Uint8Array, i2: Int16Array, i4: Int32Array, f8: Float64Array
+    };
+
+    // Decodes an array of the compact figure encoding, see compact.py
+    function decodeArray(value, shared) {
+        if (!value || typeof value !== 'object' || Array.isArray(value)) {
+            return value;
+        }
+        if (value.shared !== undefined) {
+            return decodeArray(shared[value.shared], shared);
+        }
+        if (value.bdata === undefined) {
+            return value;
+        }
+        var bytes = Uint8Array.from(atob(value.bdata), function (c) { return c.charCodeAt(0); });
+        var array = new TYPED_ARRAYS[value.dtype](bytes.buffer);
+        if (value.epoch === undefined) {
+            return array;
+        }
+        var dates = new Array(array.length);
+        for (var i = 0; i < array.length; i++) {
+            // Plotly reads dates without a time zone as yyyy-mm-dd HH:MM:SS.sss
+            var date = new Date(value.epoch + array[i] * value.unit).toISOString();
+            dates[i] = value.unit % 86400000 === 0 ? date.slice(0, 10) : date.slice(0, 23).replace('T', ' ');
+        }
+        return dates;
+    }
+
+    function decodeFigure(figure) {
+        var shared = figure.shared || [];
+        return {
+            layout: figure.layout,
+            data: figure.data.map(function (trace) {
+                var decoded = Object.assign({}, trace);
+                ['x', 'y', 'values'].forEach(function (key) {
+                    if (key in trace) {
+                        decoded[key] = decodeArray(trace[key], shared);
+                    }
+                });
+                return decoded;
+            })
+        };
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        figures: {
+            decode: function (figure) {
+                if (!figure) {
+                    return window.dash_clientside.no_update;
+                }
+                return decodeFigure(figure);
+            },
+            // Shows the traces of the selected graph type, the figure holds the
+            // actual and the prediction traces so no request is needed
+            select_graph_type: function (figure, graphType) {
+                if (!figure) {
+                    return window.dash_clientside.no_update;
+                }
+                var decoded = decodeFigure(figure);
+                decoded.data = decoded.data.map(function (trace) {
+                    return Object.assign(trace, { visible: trace.meta === graphType });
+                });
+                return decoded;
+            }
+        },
+        ui: {
+            toggle_collapse: function (n, isOpen) {
+                return n ? !isOpen : isOpen;
+            }
+        }
+    });
+})();
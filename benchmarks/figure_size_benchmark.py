@@ -0,0 +1,56 @@
+'''Compares the json size of every figure the callbacks send with the compact
+encoding of compact.py, without and with gzip.
+
+Run from the repository root with:
+    python -m benchmarks.figure_size_benchmark [days ...]
+'''
+import gzip
+import json
+import sys
+import plotly
+import aggregates
+import compact
+import constants as const
+import data
+import graphGenerator as gg
+from benchmarks.synthetic import generate_canonical_df
+
+
+def figures(cube):
+    '''Returns (name, figure) pairs of the figures built by the callbacks'''
+    locationList = [cube.location_daily(location) for location in const.LOCATION_NAMES]
+    occupationList = [cube.occupation_daily('Tampa', occupation) for occupation in const.OCCUPATION_NAMES]
+    return [
+        ('daily bar', dict(data=gg.generate_daily_bar_graph(locationList),
+                           layout=gg.generate_bar_layout('Title', 'group'))),
+        ('total scatter', dict(data=gg.generate_total_scatter(locationList, []),
+                               layout=gg.general_graph_layout('Title'))),
+        ('occupation daily', dict(data=gg.generate_employee_student_daily_graph(occupationList),
+                                  layout=gg.generate_bar_layout('Title', 'stack'))),
+        ('occupation total', dict(data=gg.generate_employee_student_total_graph(occupationList),
+                                  layout=gg.general_graph_layout('Title'))),
+        ('box plot', dict(data=gg.generate_box_plot(occupationList),
+                          layout=gg.general_graph_layout('Title'))),
+        ('pie plot', dict(data=gg.generate_pie_plot(occupationList),
+                          layout=gg.general_graph_layout('Title'))),
+    ]
+
+
+def sizes(figure):
+    '''Returns the size of the json of a figure in bytes, without and with gzip'''
+    content = json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder).encode()
+    return len(content), len(gzip.compress(content))
+
+
+def main(days):
+    print(f'{"days":>6} {"figure":>18} {"json":>10} {"compact":>10} {"json gz":>10} {"compact gz":>10}')
+    for day in days:
+        cube = aggregates.AggregateCube(data.normalize(generate_canonical_df(day)))
+        for name, figure in figures(cube):
+            plain, plainGzip = sizes(figure)
+            packed, packedGzip = sizes(compact.encode_figure(figure))
+            print(f'{day:>6} {name:>18} {plain:>10} {packed:>10} {plainGzip:>10} {packedGzip:>10}')
+
+
+if __name__ == '__main__':
+    main([int(day) for day in sys.argv[1:]] or [120, 3 * 365])
@@ -0,0 +1,72 @@
+'''Compares the forecasting backends on the historical series: fit time and the
+error on the last days of every series, which are held out of the fit.
+
+Run from the repository root with:
+    python -m benchmarks.forecast_benchmark [database uri]
+
+Without a database uri synthetic logistic growth series are used.
+'''
+import sys
+import time
+import numpy as np
+import pandas as pd
+import database
+import forecasting
+import helper_functions as hf
+
+HOLDOUT = 14
+
+
+def synthetic_series(count=4, days=120, seed=0):
+    '''Returns ds/y data frames of noisy cumulative logistic growth'''
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2020-08-24', periods=days)
+    series = []
+    for _ in range(count):
+        capacity, rate, middle = rng.uniform(200, 2000), rng.uniform(0.03, 0.1), rng.uniform(30, 90)
+        curve = capacity / (1 + np.exp(-rate * (np.arange(days) - middle)))
+        noise = np.maximum.accumulate(curve + rng.normal(0, capacity * 0.01, days))
+        series.append(pd.DataFrame({'ds': dates, 'y': noise.round().astype(int)}))
+    return series
+
+
+def historical_series(uri):
+    '''Returns the ds/y data frames of every location in the covid_data table'''
+    from sqlalchemy import create_engine
+    df = database.read_covid_data(create_engine(uri))
+    return hf.format_dfs_for_prediction(
+        [group for _, group in df.groupby('locations', observed=True)])
+
+
+def evaluate(backend, series):
+    '''Returns the fit time and the mean absolute and percentage errors on the
+    held out days'''
+    train = [s.iloc[:-HOLDOUT] for s in series]
+    start = time.perf_counter()
+    results = forecasting.FORECASTERS[backend].predict(train, HOLDOUT)
+    elapsed = time.perf_counter() - start
+
+    merged = [actual.iloc[-HOLDOUT:].merge(result, on='ds')
+              for actual, result in zip(series, results) if result is not None]
+    if not merged:
+        raise ValueError('no series could be fitted')
+    merged = pd.concat(merged)
+    absolute = (merged['yhat'] - merged['y']).abs()
+    return elapsed, absolute.mean(), (absolute / merged['y'].clip(lower=1)).mean()
+
+
+def main(uri=None):
+    series = historical_series(uri) if uri else synthetic_series()
+    print(f'{len(series)} series, {HOLDOUT} held out days')
+    print(f'{"backend":>10} {"seconds":>10} {"MAE":>10} {"MAPE":>8}')
+    for backend in forecasting.FORECASTERS:
+        try:
+            elapsed, mae, mape = evaluate(backend, series)
+        except ValueError as e:
+            print(f'{backend:>10} skipped: {e}')
+            continue
+        print(f'{backend:>10} {elapsed:>10.3f} {mae:>10.1f} {mape:>8.2%}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
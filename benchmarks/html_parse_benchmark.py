@@ -0,0 +1,36 @@
+'''Compares parsing the whole USF page with BeautifulSoup against the scoped
+parse of the article body in data.py, with every available parser backend.
+
+Run from the repository root with:
+    python -m benchmarks.html_parse_benchmark [sections]
+'''
+import sys
+import timeit
+from bs4 import BeautifulSoup
+import data
+from benchmarks.synthetic import generate_page
+
+
+def full_page_parse(page):
+    # What __get_data did before the scoped parse
+    soup = BeautifulSoup(page, 'html.parser')
+    dataDiv = soup.find('div', {'class': 'article-body'})
+    return list(zip(dataDiv.find_all('ul'), dataDiv.find_all('h3')))
+
+
+def main(sections):
+    page = generate_page(sections)
+    print(f'page of {len(page):,} bytes with {sections} date sections')
+    best = min(timeit.repeat(lambda: full_page_parse(page), number=1, repeat=3))
+    print(f'{"full page html.parser":>25} {best:.4f}s')
+    parsers = ['html.parser']
+    if data.HTML_PARSER != 'html.parser':
+        parsers.append(data.HTML_PARSER)
+    for parser in parsers:
+        best = min(timeit.repeat(lambda: data.parse_page(page, parser=parser),
+                                 number=1, repeat=3))
+        print(f'{"scoped " + parser:>25} {best:.4f}s')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 365)
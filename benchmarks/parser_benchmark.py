@@ -0,0 +1,29 @@
+'''Times the bullet classifier in data.py on a synthetic corpus of bullets.
+
+Run from the repository root with:
+    python -m benchmarks.parser_benchmark [bullets]
+'''
+import sys
+import time
+import data
+from benchmarks.synthetic import generate_bullets
+
+
+def main(count):
+    bullets = generate_bullets(count)
+
+    start = time.perf_counter()
+    for bullet in bullets:
+        data.__parser(bullet)
+    elapsed = time.perf_counter() - start
+    print(f'__parser:      {count} bullets in {elapsed:.3f}s ({count / elapsed:,.0f} bullets/s)')
+
+    start = time.perf_counter()
+    parsed, unmatched = data.parse_bullets(bullets)
+    elapsed = time.perf_counter() - start
+    print(f'parse_bullets: {count} bullets in {elapsed:.3f}s ({count / elapsed:,.0f} bullets/s), '
+          f'{len(unmatched)} unmatched')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
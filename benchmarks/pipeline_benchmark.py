@@ -0,0 +1,163 @@
+'''Benchmarks the scrape -> parse -> callback -> figure pipeline on synthetic data
+and reports time and peak memory of every stage. Runs offline.
+
+Run from the repository root with:
+    python -m benchmarks.pipeline_benchmark [--output results.json] [--compare old.json]
+
+The json output records the commit, so results of two commits can be compared
+with --compare.
+'''
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+import constants as const
+import data
+import graphGenerator as gg
+import helper_functions as hf
+import serialization
+from benchmarks.synthetic import generate_canonical_df, generate_page
+
+# name: (days, campuses)
+SCENARIOS = {
+    'semester': (120, 4),
+    'three-years': (3 * 365, 4),
+    'many-campuses': (365, 40),
+}
+REPEAT = 5
+
+
+def measure(function, repeat=REPEAT):
+    '''Returns the best and mean time in seconds and the peak memory in bytes of
+    calling function'''
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dict(best=min(times), mean=sum(times) / len(times), peak=peak)
+
+
+def clear_caches(app):
+    '''Forgets every cube and memoized figure so callbacks are measured cold'''
+    import aggregates
+    aggregates.__cubes.clear()
+    for function in [app.daily_bar_figure, app.total_scatter_figure, app.occupation_daily_figure,
+                     app.tab_content]:
+        function.cache_clear()
+
+
+def pipeline_stages(days, campuses):
+    '''Returns (stage name, function) pairs for one scenario'''
+    import aggregates
+    import app
+
+    page = generate_page(days)
+    df = data.normalize(generate_canonical_df(days, campuses))
+    store = serialization.encode(df)
+    storeJson = json.dumps(store)
+    legacyJson = df.assign(dates=hf.format_dates(df['dates'])).to_json()
+    cube = aggregates.AggregateCube(df, store['version'])
+    locationList = [cube.location_daily(location) for location in const.LOCATION_NAMES]
+    occupationList = [cube.occupation_daily('Tampa', occupation)
+                      for occupation in const.OCCUPATION_NAMES]
+    # Callbacks read the snapshot of the refresher, seeded here instead of being
+    # loaded from the database. The refresher thread is never started.
+    app.refresher.set(store)
+    app.refresher.start = lambda: None
+    version = store['version']
+
+    # Callbacks are wrapped by Dash, __wrapped__ is the plain function
+    def cold(callback, *args):
+        def run():
+            clear_caches(app)
+            callback.__wrapped__(*args)
+        return run
+
+    return [
+        ('parse page', lambda: data.parse_page(page)),
+        ('hf.string_to_df', lambda: hf.string_to_df(legacyJson)),
+        ('serialization.decode', lambda: serialization.decode(json.loads(storeJson))),
+        ('aggregate cube', lambda: aggregates.AggregateCube(df, store['version'])),
+        ('updateDataTable cold', cold(app.updateDataTable, version, 0, const.TABLE_PAGE_SIZE, [], '')),
+        ('updateDataTable sorted and filtered', lambda: app.updateDataTable.__wrapped__(
+            version, 3, const.TABLE_PAGE_SIZE, [dict(column_id='cases', direction='desc')],
+            '{locations} = "Tampa" && {cases} >= 1')),
+        ('updateCards cold', cold(app.updateCards, version)),
+        ('create_general_graphs cold', cold(app.create_general_graphs, version, None)),
+        ('campus_graphs cold', cold(app.campus_graphs, version, 'Tampa', None)),
+        ('updateCards warm', lambda: app.updateCards.__wrapped__(version)),
+        ('campus_graphs warm', lambda: app.campus_graphs.__wrapped__(version, 'Tampa', None)),
+        ('gg.generate_daily_bar_graph', lambda: gg.generate_daily_bar_graph(locationList)),
+        ('gg.generate_total_scatter', lambda: gg.generate_total_scatter(locationList, [])),
+        ('gg.generate_employee_student_daily_graph',
+         lambda: gg.generate_employee_student_daily_graph(occupationList)),
+        ('gg.generate_employee_student_total_graph',
+         lambda: gg.generate_employee_student_total_graph(occupationList)),
+        ('gg.generate_box_plot', lambda: gg.generate_box_plot(occupationList)),
+        ('gg.generate_pie_plot', lambda: gg.generate_pie_plot(occupationList)),
+        ('gg.generate_bar_layout', lambda: gg.generate_bar_layout('Title', 'group')),
+        ('gg.general_graph_layout', lambda: gg.general_graph_layout('Title')),
+    ]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scenarios):
+    '''Returns the results of every stage of every scenario'''
+    results = []
+    for scenario in scenarios:
+        days, campuses = SCENARIOS[scenario]
+        for stage, function in pipeline_stages(days, campuses):
+            result = measure(function)
+            results.append(dict(scenario=scenario, stage=stage, **result))
+            print(f'{scenario:>14} {stage:>42} {result["best"] * 1000:>10.2f}ms '
+                  f'{result["peak"] / 2 ** 20:>8.2f}MiB', flush=True)
+    return results
+
+
+def compare(results, oldResults):
+    '''Prints the ratio of the new best time to the old one for every stage'''
+    old = {(r['scenario'], r['stage']): r for r in oldResults['results']}
+    print(f'\ncompared with {oldResults["commit"]}')
+    for result in results:
+        previous = old.get((result['scenario'], result['stage']))
+        if previous:
+            print(f'{result["scenario"]:>14} {result["stage"]:>42} '
+                  f'{result["best"] / previous["best"]:>8.2f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS))
+    parser.add_argument('--output', help='write the results as json to this file')
+    parser.add_argument('--compare', help='json results of an earlier run')
+    args = parser.parse_args()
+
+    results = run(args.scenario or list(SCENARIOS))
+    report = dict(commit=git_commit(), created=datetime.now().isoformat(),
+                  python=platform.python_version(), machine=platform.machine(), results=results)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    if args.compare:
+        with open(args.compare) as old:
+            compare(results, json.load(old))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
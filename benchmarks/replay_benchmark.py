@@ -0,0 +1,35 @@
+'''Re-parses every archived snapshot of a page (see archive.py) and reports the
+parse time, rows and unparsed bullets of each, then rebuilds the whole history.
+Run it before and after a parser change to compare the results on real pages.
+
+Run from the repository root with:
+    python -m benchmarks.replay_benchmark [url]
+'''
+import sys
+import time
+import archive
+import constants as const
+import data
+
+
+def main(url):
+    entries = archive.snapshots(url)
+    if not entries:
+        print(f'No archived snapshots of {url} in {const.ARCHIVE_DIR}')
+        return
+    print(f'{"snapshot":>12} {"fetched":>20} {"ms":>8} {"rows":>6} {"unparsed":>8}')
+    for entry in entries:
+        start = time.perf_counter()
+        df, unmatched = data.replay(url, entry['hash'])
+        elapsed = time.perf_counter() - start
+        print(f'{entry["hash"][:12]:>12} {entry["fetched"][:19]:>20} {elapsed * 1000:>8.1f} '
+              f'{len(df):>6} {len(unmatched):>8}')
+    start = time.perf_counter()
+    df, unmatched = data.replay(url, 'all')
+    print(f'\nhistory of {len(entries)} snapshots: {len(df)} rows from {df["dates"].min():%Y-%m-%d} '
+          f'to {df["dates"].max():%Y-%m-%d}, {len(unmatched)} unparsed bullets, '
+          f'{time.perf_counter() - start:.2f}s')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else const.USF_CASES_URL)
@@ -0,0 +1,48 @@
+'''Compares the dcc.Store round trip of DataFrame.to_json + hf.string_to_df with
+the codecs in serialization.py.
+
+Run from the repository root with:
+    python -m benchmarks.serialization_benchmark [rows ...]
+'''
+import ast
+import json
+import sys
+import timeit
+import pandas as pd
+import serialization
+from benchmarks.synthetic import generate_df
+
+# ast.literal_eval of the to_json string needs several GB above this size
+LEGACY_MAX_ROWS = 100_000
+
+
+def current_round_trip(df):
+    # Same as hf.string_to_df, which the callbacks run on the store content
+    return pd.DataFrame(ast.literal_eval(json.loads(json.dumps(df.to_json()))))
+
+
+def codec_round_trip(df, codec):
+    return serialization.decode(json.loads(json.dumps(serialization.encode(df, codec))))
+
+
+def measure(function, *args, repeat=3):
+    '''Returns the best time out of repeat runs in seconds'''
+    return min(timeit.repeat(lambda: function(*args), number=1, repeat=repeat))
+
+
+def main(sizes):
+    print(f'{"rows":>10} {"codec":>10} {"bytes":>12} {"seconds":>10}')
+    for rows in sizes:
+        df = generate_df(rows)
+        size = len(json.dumps(df.to_json()))
+        if rows <= LEGACY_MAX_ROWS:
+            print(f'{rows:>10} {"to_json":>10} {size:>12} {measure(current_round_trip, df):>10.4f}')
+        else:
+            print(f'{rows:>10} {"to_json":>10} {size:>12} {"skipped":>10}')
+        for codec in serialization.CODECS:
+            size = len(json.dumps(serialization.encode(df, codec)))
+            print(f'{rows:>10} {codec:>10} {size:>12} {measure(codec_round_trip, df, codec):>10.4f}')
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,78 @@
+'''Synthetic USF style data for the benchmarks. Everything is generated from a
+seed, so runs on different commits use the same inputs.'''
+import random
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import constants as const
+
+BULLETS = ['One Tampa student', 'Two Tampa employees', 'Three St. Petersburg students',
+           'One USF Health resident', 'Four USF Health students',
+           'One Sarasota-Manatee employee']
+LOCATIONS = ['Tampa', 'St. Petersburg', 'USF Health', 'Sarasota-Manatee', 'USF Medical']
+OCCUPATIONS = ['student', 'students', 'employee', 'employees', 'residents', 'student-employee:']
+NUMBERS = ['One', 'Two', 'Three', 'twenty-one', '4', '12', 'A']
+# Dates of the generated frames stay within ten years, whatever the number of rows
+MAX_DAYS = 10 * 365
+
+
+def campus_names(count):
+    '''Returns the known locations followed by made up ones up to count'''
+    return (const.LOCATION_NAMES + [f'Campus {i}' for i in range(count)])[:count]
+
+
+def generate_df(rows, seed=0):
+    '''Returns a USF style data frame as it comes out of the scraper before it is
+    normalized, with the requested number of rows. There are 8 rows per date up to
+    MAX_DAYS dates, larger frames get more rows per date.'''
+    rng = np.random.default_rng(seed)
+    days = min(max(rows // 8, 1), MAX_DAYS)
+    dates = pd.date_range('2020-08-24', periods=days).strftime('%B %d %Y')
+    return pd.DataFrame({
+        'dates': np.repeat(np.asarray(dates), -(-rows // days))[:rows],
+        'locations': rng.choice(const.CAMPUS_NAMES, rows),
+        'occupations': rng.choice(const.OCCUPATION_NAMES, rows),
+        'cases': rng.integers(1, 30, rows),
+    })
+
+
+def generate_canonical_df(days, campuses=4, seed=0):
+    '''Returns a canonical data frame (see data.normalize) with one row per date,
+    campus and occupation, for the given number of days and campuses'''
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2020-08-24', periods=days)
+    index = pd.MultiIndex.from_product([dates, campus_names(campuses), const.OCCUPATION_NAMES],
+                                       names=['dates', 'locations', 'occupations'])
+    df = index.to_frame(index=False)
+    df['cases'] = rng.poisson(5, len(df)) + 1
+    return df
+
+
+def generate_bullets(count, seed=0):
+    '''Returns a list of USF style bullets, about 1% of them cannot be parsed'''
+    rng = random.Random(seed)
+    bullets = []
+    for _ in range(count):
+        if rng.random() < 0.01:
+            bullets.append('Update pending from the Department of Health')
+        else:
+            bullets.append(f'{rng.choice(NUMBERS)} {rng.choice(LOCATIONS)} '
+                           f'{rng.choice(OCCUPATIONS)}*')
+    return bullets
+
+
+def generate_page(sections, seed=0):
+    '''Returns an archived style cases page with the requested number of date
+    sections wrapped in navigation, scripts and other page content'''
+    rng = random.Random(seed)
+    filler = ''.join(f'<li><a href="/page-{i}">Link {i}</a></li>' for i in range(2000))
+    script = '<script>' + 'var x = 1;' * 5000 + '</script>'
+    body = []
+    start = date(2020, 8, 24)
+    for day in reversed(range(sections)):
+        title = (start + timedelta(days=day)).strftime('%B %-d')
+        items = ''.join(f'<li>{rng.choice(BULLETS)}</li>' for _ in range(rng.randint(2, 8)))
+        body.append(f'<h3>{title}</h3><ul>{items}</ul>')
+    return (f'<html><head>{script}</head><body><nav><ul>{filler}</ul></nav>'
+            f'<div class="article-body">{"".join(body)}</div>'
+            f'<footer><ul>{filler}</ul></footer></body></html>')
@@ -0,0 +1,54 @@
+'''Compares building the figures of graphGenerator as plain dicts with building
+them through the validated plotly.graph_objs path (VALIDATE_FIGURES).
+
+Run from the repository root with:
+    python -m benchmarks.trace_builder_benchmark [days ...]
+'''
+import sys
+import timeit
+import aggregates
+import constants as const
+import data
+import graphGenerator as gg
+from benchmarks.synthetic import generate_canonical_df
+
+
+def builders(cube):
+    '''Returns (name, function) pairs building the traces and layout of every figure'''
+    locationList = [cube.location_daily(location) for location in const.LOCATION_NAMES]
+    occupationList = [cube.occupation_daily('Tampa', occupation) for occupation in const.OCCUPATION_NAMES]
+    return [
+        ('daily bar', lambda: (gg.generate_daily_bar_graph(locationList),
+                               gg.generate_bar_layout('Title', 'group'))),
+        ('total scatter', lambda: (gg.generate_total_scatter(locationList, []),
+                                   gg.general_graph_layout('Title'))),
+        ('occupation daily', lambda: (gg.generate_employee_student_daily_graph(occupationList),
+                                      gg.generate_bar_layout('Title', 'stack'))),
+        ('occupation total', lambda: (gg.generate_employee_student_total_graph(occupationList),
+                                      gg.general_graph_layout('Title'))),
+        ('box plot', lambda: (gg.generate_box_plot(occupationList), gg.general_graph_layout('Title'))),
+        ('pie plot', lambda: (gg.generate_pie_plot(occupationList), gg.general_graph_layout('Title'))),
+    ]
+
+
+def measure(function, validate, repeat=5):
+    '''Returns the best time out of repeat runs in seconds'''
+    const.VALIDATE_FIGURES = validate
+    try:
+        return min(timeit.repeat(function, number=1, repeat=repeat))
+    finally:
+        const.VALIDATE_FIGURES = False
+
+
+def main(days):
+    print(f'{"days":>6} {"figure":>18} {"graph_objs ms":>14} {"dict ms":>10} {"speedup":>8}')
+    for day in days:
+        cube = aggregates.AggregateCube(data.normalize(generate_canonical_df(day)))
+        for name, function in builders(cube):
+            validated, plain = measure(function, True), measure(function, False)
+            print(f'{day:>6} {name:>18} {validated * 1000:>14.2f} {plain * 1000:>10.2f} '
+                  f'{validated / plain:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main([int(day) for day in sys.argv[1:]] or [120, 3 * 365])
@@ -0,0 +1,67 @@
+from collections import Counter
+import base64
+import numpy as np
+
+# Compact encoding of the figures sent to the browser, decoded by figures.decode in
+# assets/clientside.js. Numeric arrays of traces are sent as base64 little endian
+# typed arrays, dates as offsets from the first date and x arrays several traces
+# have in common are sent once in the shared list of the figure:
+#   {'dtype': 'i2', 'bdata': '...'}
+#   {'dtype': 'i2', 'bdata': '...', 'epoch': <ms>, 'unit': <ms>}
+#   {'shared': <index into figure['shared']>}
+
+ARRAY_KEYS = ['x', 'y', 'values']
+MIN_LENGTH = 8  # Shorter arrays are smaller as json
+DAY_MS = 24 * 60 * 60 * 1000
+INT_TYPES = ['<i1', '<i2', '<i4']
+
+
+def __typed(array):
+    '''Returns a numeric array as a base64 typed array with the smallest dtype'''
+    if array.dtype.kind in 'iub':
+        low, high = (int(array.min()), int(array.max())) if len(array) else (0, 0)
+        dtype = next((t for t in INT_TYPES if np.iinfo(t).min <= low and high <= np.iinfo(t).max),
+                     '<f8')
+    else:
+        dtype = '<f8'
+    return dict(dtype=dtype[1:], bdata=base64.b64encode(array.astype(dtype).tobytes()).decode('ascii'))
+
+
+def encode_array(values):
+    '''Returns numeric and datetime arrays as typed arrays, other values unchanged'''
+    if isinstance(values, (str, dict)) or not hasattr(values, '__len__') or len(values) < MIN_LENGTH:
+        return values
+    array = np.asarray(values)
+    if np.issubdtype(array.dtype, np.datetime64):
+        ms = array.astype('datetime64[ms]').astype('int64')
+        unit = DAY_MS if (ms % DAY_MS == 0).all() else 1
+        return dict(__typed((ms - ms[0]) // unit), epoch=int(ms[0]), unit=unit)
+    if array.dtype.kind in 'iubf':
+        return __typed(array)
+    return values
+
+
+def encode_figure(figure):
+    '''Returns a figure with a data list of traces and a layout in the compact encoding'''
+    traces = [trace.to_plotly_json() if hasattr(trace, 'to_plotly_json') else dict(trace)
+              for trace in figure['data']]
+    for trace in traces:
+        for key in ARRAY_KEYS:
+            if key in trace:
+                trace[key] = encode_array(trace[key])
+
+    # x arrays of more than one trace are moved to the shared list
+    keys = [tuple(sorted(trace['x'].items())) if isinstance(trace.get('x'), dict) else None
+            for trace in traces]
+    counts = Counter(keys)
+    shared, positions = [], {}
+    for trace, key in zip(traces, keys):
+        if key is not None and counts[key] > 1:
+            if key not in positions:
+                positions[key] = len(shared)
+                shared.append(trace['x'])
+            trace['x'] = dict(shared=positions[key])
+    figure = dict(figure, data=traces)
+    if shared:
+        figure['shared'] = shared
+    return figure
@@ -14,5 +14,70 @@ SEAGLASS = '#80B0A6'
 GENERAL_COLORS = [DARK_GREEN, LIGHT_GOLD, SEAGLASS, TEAL]
 OCCUPATION_COLORS = [STORM, APPLE]
 CAMPUS_NAMES = ['Tampa', 'St. Petersburg', 'USF Health', 'Sarasota Manatee']
+LOCATION_NAMES = ['Tampa', 'St. Pete', 'Health', 'Sarasota Manatee']
 OCCUPATION_NAMES = ['Student', 'Employee']
-PREDICTION_COL_NAMES = ['YHAT_TAMPA', 'YHAT_ST_PETE', 'YHAT_HEALTH'] 
+
+# Cache
+CACHE_DIR = 'cache-directory'
+CACHE_TIMEOUT = 60 * 60
+CACHE_THRESHOLD = 50
+DATASET_CACHE_KEY = 'dataset'
+DATASET_LOCK_KEY = 'dataset-lock'
+DATASET_LOCK_TIMEOUT = 60
+
+# Scraper
+USF_CASES_URL = 'https://www.usf.edu/coronavirus/updates/usf-cases.aspx'
+FETCH_TIMEOUT = 30
+FETCH_RETRIES = 3
+POOL_CONNECTIONS = 4
+SCRAPE_INTERVAL_MINUTES = 30
+
+# Aggregates
+CUBE_VERSIONS = 2
+FIGURE_CACHE_SIZE = 64
+
+# Predictions
+PREDICTION_CHECK_INTERVAL = 60
+FORECAST_WORKERS = None  # None uses one worker per cpu
+FORECAST_PERIODS = 50
+FORECAST_BACKEND = 'prophet'
+
+# Metrics
+SLOW_CALLBACK_SECONDS = 1.0  # None disables the slow callback log
+SLOW_CALLBACK_PROFILE = False  # Profile every callback to print a cProfile dump of slow ones
+
+# Data table
+TABLE_COLUMNS = ['dates', 'locations', 'occupations', 'cases']
+TABLE_PAGE_SIZE = 25
+
+# Downsampling
+MAX_TRACE_POINTS = 500
+
+# Figures
+VALIDATE_FIGURES = False  # Validate tracers with plotly.graph_objs, slower but catches typos
+LAYOUT_CACHE_SIZE = 64
+
+# Sources
+SOURCE_WORKERS = 8
+HOST_CONNECTIONS = 2  # Concurrent requests to one host
+REFRESH_TIMEOUT = 2 * FETCH_TIMEOUT  # Sources slower than this keep their last rows
+
+# Refresher
+REFRESH_INTERVAL = 5 * 60  # Seconds between rebuilds of the dataset in the web process
+REFRESH_MIN_INTERVAL = 30  # Requested rebuilds closer to the last one are ignored
+
+# Data endpoint
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+DELIVERY_CACHE_SIZE = 8  # Compressed bodies of the most recent dataset and figure versions
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'  # Cached, but checked with the ETag on every use
+
+# Page archive
+ARCHIVE_DIR = 'page-archive'
+ARCHIVE_PAGES = True  # Store every fetched page in the archive
+OFFLINE = False  # Parse archived pages instead of fetching them, see data.replay
+
+# Trends
+TREND_WINDOWS = (7, 14, 30)  # Days of the growth, average and doubling time windows
+TREND_DAYS = 14  # Window of the growth in the campus overview
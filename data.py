@@ -1,94 +1,330 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from word2number import w2n
 import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
 from datetime import datetime
+import re
 
 # from fbprophet import Prophet
-import helper_functions as hf
+import constants as const
+import archive
+
+# lxml is optional, it parses much faster than the html.parser that ships with python
+try:
+    import lxml
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Only the article body is turned into a tree, the rest of the page is skipped
+ARTICLE_STRAINER = SoupStrainer('div', {'class': 'article-body'})
+
+# Lookup tables for the bullet classifier.
+# Location regex from the original TODO:
+# r"\b(?:Peter(?:sburg)?|tam(?:pa)?|saraso(?:ta)?|medi(?:cal)?|heal(?:th)?)"mig
+# Occupation regex from the original TODO:
+# r"\b(?:stud(?:ent)?|empl(?:oyee)?|resi(?:dent)?|heal(?:th)?)"mig
+LOCATION_REGEX = re.compile(r"(?:st\.?|pete(?:rsburg)?|tam(?:pa)?|saraso(?:ta)?(?:-manatee)?|manatee|medi(?:cal)?|heal(?:th)?)$")
+OCCUPATION_REGEX = re.compile(r"(?:stud(?:ents?)?|student-employees?|empl(?:oyees?)?|resi(?:dents?)?)$")
+KEYWORD_CANDIDATES = ['st', 'st.', 'pete', 'peter', 'petersburg', 'tam', 'tampa', 'saraso',
+                      'sarasota', 'sarasota-manatee', 'manatee', 'medi', 'medical', 'heal',
+                      'health', 'stud', 'student', 'students', 'student-employee',
+                      'student-employees', 'empl', 'employee', 'employees', 'resi',
+                      'resident', 'residents']
+PUNCTUATION = ':,;.)'
+
+LOCATION_SYNONYMS = {
+    'st': 'St. Pete', 'pete': 'St. Pete', 'tam': 'Tampa', 'saraso': 'Sarasota Manatee',
+    'manatee': 'Sarasota Manatee', 'medi': 'Health', 'heal': 'Health',
+}
+OCCUPATION_SYNONYMS = {'stud': 'Student', 'empl': 'Employee', 'resi': 'Employee'}
+
+# Locations are checked in this order when a bullet mentions more than one
+LOCATION_PRIORITY = ['Tampa', 'St. Pete', 'Health', 'Sarasota Manatee']
+# Health residents are counted as employees, so employees win for Health
+OCCUPATION_PRIORITY = {'Health': ['Employee', 'Student']}
+DEFAULT_OCCUPATION_PRIORITY = ['Student', 'Employee']
+OCCUPATION_FLAGS = {'Student': 1, 'Employee': 2}
+
+NUMBER_WORDS = {word: value for word, value in w2n.american_number_system.items()
+                if word != 'point'}
+
+
+def __build_keywords():
+    '''Returns a table that maps every token the regexes accept, with trailing
+    punctuation, to a (location rank, occupation flag) pair. Tokens are looked up
+    in it instead of running the regexes on every bullet.'''
+    keywords = {}
+    for word in KEYWORD_CANDIDATES:
+        rank = len(LOCATION_PRIORITY)
+        flag = 0
+        if LOCATION_REGEX.match(word):
+            location = next(value for prefix, value in LOCATION_SYNONYMS.items()
+                            if word.startswith(prefix))
+            rank = LOCATION_PRIORITY.index(location)
+        if OCCUPATION_REGEX.match(word):
+            flag = OCCUPATION_FLAGS[next(value for prefix, value in OCCUPATION_SYNONYMS.items()
+                                         if word.startswith(prefix))]
+        for suffix in [''] + list(PUNCTUATION):
+            keywords.setdefault(word + suffix, (rank, flag))
+    return keywords
+
+
+def __build_results():
+    '''Returns a table from (location rank, occupation flags) to the
+    (location, occupation) pair of a bullet'''
+    results = {}
+    for rank, location in enumerate(LOCATION_PRIORITY):
+        for flags in range(1, 4):
+            occupation = next(o for o in OCCUPATION_PRIORITY.get(location, DEFAULT_OCCUPATION_PRIORITY)
+                              if flags & OCCUPATION_FLAGS[o])
+            results[(rank, flags)] = (location, occupation)
+    return results
+
+
+KEYWORDS = __build_keywords()
+RESULTS = __build_results()
+
 
 def __get_number(text):
-    try:
-        return w2n.word_to_num(text)
-    except Exception as e:
+    '''Returns the number at the start of a bullet, 1 when there is none'''
+    text = text.strip('(),.:')
+    digits = text.replace(',', '')
+    if digits.isdigit():
+        return int(digits)
+    # Number words, including hyphenated ones such as twenty-one or one-hundred
+    parts = text.split('-')
+    if not all(part in NUMBER_WORDS for part in parts):
         return 1
+    total, current = 0, 0
+    for part in parts:
+        value = NUMBER_WORDS[part]
+        # Scale words multiply the number before them instead of adding to it
+        if value == 100:
+            current = (current or 1) * value
+        elif value >= 1000:
+            total += (current or 1) * value
+            current = 0
+        else:
+            current += value
+    return total + current
+
+
+def __classify(text):
+    '''Returns location, occupation and number of cases of a bullet, or None
+    when the bullet does not name a known location and occupation'''
+    tokens = text.replace('*', '').lower().split()
+    if not tokens:
+        return None
+    rank = len(LOCATION_PRIORITY)
+    flags = 0
+    for token in tokens:
+        keyword = KEYWORDS.get(token)
+        if keyword is not None:
+            rank = min(rank, keyword[0])
+            flags |= keyword[1]
+    result = RESULTS.get((rank, flags))
+    if result is None:
+        return None
+    return result[0], result[1], __get_number(tokens[0])
+
+
+def parse_bullets(texts):
+    '''Parses a list of bullet texts at once.
+    Output: dictionary with the index of every matched bullet and its location,
+    occupation and cases, and a list of the bullets that could not be parsed.'''
+    parsed = {'index': [], 'locations': [], 'occupations': [], 'cases': []}
+    unmatched = []
+    # The same bullets repeat a lot on the page, each distinct text is classified once
+    seen = {}
+    for index, text in enumerate(texts):
+        if text in seen:
+            result = seen[text]
+        else:
+            result = seen[text] = __classify(text)
+        if result is None:
+            #TODO Include Sarasota campus when cases increase significantly
+            unmatched.append(dict(index=index, text=text))
+            continue
+        parsed['index'].append(index)
+        parsed['locations'].append(result[0])
+        parsed['occupations'].append(result[1])
+        parsed['cases'].append(result[2])
+    return parsed, unmatched
 
 
 def __parser(text):
-    # Everything to lower
-    text = text.replace('*','').lower().split()
-    num = __get_number(text[0])
-    # TODO Convert to Regex 
-    # Regex for location
-    # r"\b(?:Peter(?:sburg)?|tam(?:pa)?|saraso(?:ta)?|medi(?:cal)?|heal(?:th)?)"mig
-    # Regex for occupation
-    # r"\b(?:stud(?:ent)?|empl(?:oyee)?|resi(?:dent)?|heal(?:th)?)"mig 
-    
-    if 'tampa' in text and ('student' in text or 'students' in text
-                            or 'student-employee:' in text):
-        return 'Tampa', 'Student', num
-    elif 'tampa' in text and ('employee' in text or 'employees' in text):
-        return 'Tampa', 'Employee', num
-    elif ('st.' in text or 'st' in text) and ('student' in text or 'students' in text):
-        return 'St. Pete', 'Student', num
-    elif ('st.' in text or 'st' in text) and ('employee' in text or 'employees' in text):
-        return 'St. Pete', 'Employee', num
-    elif ('health' in text or 'medical'
-          in text) and ('employee' in text or 'employees' in text
-                        or 'resident' in text or 'residents' in text):
-        return 'Health', 'Employee', num
-    elif ('health' in text or 'medical' in text) and ('student' in text
-                                                      or 'students' in text):
-        return 'Health', 'Student', num
-    elif 'sarasota-manatee' in text and ('student' in text
-                                         or 'students' in text):
-        return 'Sarasota Manatee', 'Student', num
-    elif 'sarasota-manatee' in text and ('employee' in text
-                                         or 'employees' in text):
-        return 'Sarasota Manatee', 'Employee', num
-    else:
-        print('__parser has an error')
-        print(text)
-        #TODO Include Sarasota campus when cases increase significantly
-        return -1, -1, -1
+    '''Returns location, occupation and number of cases of a bullet, -1 for
+    each when the bullet could not be parsed'''
+    return __classify(text) or (-1, -1, -1)
+
+
+# Session reused between fetches so the connection to the USF site stays open
+__session = None
 
+# State of the incremental scraper. The watermark is the newest date section that
+# was parsed, older sections are not parsed again.
+__state = dict(etag=None, lastModified=None, watermark=None, df=None, unmatched=[])
 
-def __get_data():
-    url = "https://www.usf.edu/coronavirus/updates/usf-cases.aspx"
-    response = requests.get(url)
-    pageContent = response.content
-    soup = BeautifulSoup(pageContent, 'html.parser')
+
+def get_session():
+    '''Returns a requests session with connection pooling, retries and gzip'''
+    global __session
+    if __session is None:
+        __session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=const.POOL_CONNECTIONS,
+                              pool_maxsize=const.POOL_CONNECTIONS,
+                              max_retries=Retry(total=const.FETCH_RETRIES,
+                                                backoff_factor=0.5,
+                                                status_forcelist=[500, 502, 503, 504]))
+        __session.mount('http://', adapter)
+        __session.mount('https://', adapter)
+        __session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+    return __session
+
+
+def fetch_page(url, headers=None):
+    '''Returns the response for a page, archived when it has content (see
+    archive.py). Sources call it for their pages too.'''
+    response = get_session().get(url, headers=headers, timeout=const.FETCH_TIMEOUT)
+    response.raise_for_status()
+    if const.ARCHIVE_PAGES and response.status_code == 200:
+        archive.store(url, response.content)
+    return response
+
+
+def __format_date(date, fetched=None):
+    '''Returns the date of a section as it is stored in the data frame. Sections
+    have no year, it is the year the page was fetched.'''
+    date = date.replace('*', '').strip()
+    # TODO Add regex
+    # regex = r"\b(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may?|jun(?:e)?|jul(?:y)?|aug(?:ust)?|oct(?:ober)?|(sept|nov|dec)(?:ember)?)"gm
+    if date == 'Septemebr 3':
+        date = 'September 3'
+    fetched = fetched or datetime.today()
+    text = (date + ' ' + str(fetched.year)).title()
+    try:
+        # December sections on a page fetched in January
+        if datetime.strptime(text, '%B %d %Y') > fetched:
+            text = (date + ' ' + str(fetched.year - 1)).title()
+    except ValueError:
+        pass
+    return text
+
+
+def parse_page(pageContent, watermark=None, parser=None, fetched=None):
+    '''Returns a data frame with the cases on the page and the bullets that could
+    not be parsed. When a watermark is given only the sections from that date
+    onward are parsed. fetched is when the page was fetched, now by default.'''
+    soup = BeautifulSoup(pageContent, parser or HTML_PARSER, parse_only=ARTICLE_STRAINER)
     dataDiv = soup.find('div', {'class': 'article-body'})
 
-    # Get all the available dates
-    datesTag = dataDiv.find_all('h3')
-    datesText = [date.get_text().replace('*','') for date in datesTag]
-    # Get all the data regarding cases
-    # Lists for data frame
-    dataDict = {'dates': [], 'locations': [], 'occupations': [], 'cases': []}
-
-    casesTag = dataDiv.find_all('ul')
-    for case, date in zip(casesTag, datesText):
-        dailyContent = case.find_all('li')
-        for text in dailyContent:
-            location, occupation, numOfCases = __parser(text.get_text())
-            dataDict.get('locations').append(location)
-            dataDict.get('occupations').append(occupation)
-            dataDict.get('cases').append(numOfCases)
-            # TODO Add regex
-            # regex = r"\b(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may?|jun(?:e)?|jul(?:y)?|aug(?:ust)?|oct(?:ober)?|(sept|nov|dec)(?:ember)?)"gm
-            if date == 'Septemebr 3':
-                date = 'September 3'
-            dataDict.get('dates').append(
-                (date + ' ' + str(datetime.today().year)).title())
-    # + ' ' +str(datetime.today().year)
-    # df['dates'] = df['dates'].apply(lambda date: datetime.strptime(date, '%B %d %Y'))
+    # Walk the dates and lists in document order, every list belongs to the
+    # date above it
+    texts = []
+    textDates = []
+    date = None
+    for tag in dataDiv.find_all(['h3', 'ul']):
+        if tag.name == 'h3':
+            date = __format_date(tag.get_text(), fetched)
+            # Newest sections come first, stop at the first one older than the watermark
+            if watermark is not None and datetime.strptime(date, '%B %d %Y') < watermark:
+                break
+        elif date is not None and tag.parent.name != 'li':
+            for text in tag.find_all('li'):
+                texts.append(text.get_text())
+                textDates.append(date)
+
+    parsed, unmatched = parse_bullets(texts)
+    dataDict = {'dates': [textDates[index] for index in parsed['index']],
+                'locations': parsed['locations'],
+                'occupations': parsed['occupations'],
+                'cases': parsed['cases']}
+    for line in unmatched:
+        line['date'] = textDates[line['index']]
     df = pd.DataFrame(dataDict)
     df = df.reindex(index=df.index[::-1])
     df = df.groupby(['dates', 'locations', 'occupations'],
                     sort=False,
                     as_index=False).sum()
-    # return df.to_json()
-    print(df)
-    return df
+    return normalize(df), unmatched
+
+
+def normalize(df):
+    '''Returns the canonical data frame used everywhere after scraping: datetime64
+    dates, categorical locations and occupations and int32 cases'''
+    dates = df['dates']
+    if not is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, format='%B %d %Y')
+    # Known names keep their order, names from new sources are added after them
+    locations = const.LOCATION_NAMES + sorted(set(df['locations']) - set(const.LOCATION_NAMES))
+    occupations = const.OCCUPATION_NAMES + sorted(set(df['occupations']) - set(const.OCCUPATION_NAMES))
+    return pd.DataFrame({
+        'dates': dates.to_numpy(),
+        'locations': pd.Categorical(df['locations'], categories=locations),
+        'occupations': pd.Categorical(df['occupations'], categories=occupations),
+        'cases': df['cases'].to_numpy().astype('int32'),
+    }, index=pd.RangeIndex(len(df)))
+
+
+def replay(url=const.USF_CASES_URL, snapshot='all', directory=const.ARCHIVE_DIR):
+    '''Returns the data frame and the unparsed bullets of archived snapshots of the
+    page, without the network. snapshot is the hash of a snapshot, 'latest' for the
+    newest one or 'all' to rebuild the history from every snapshot. For every date
+    the rows of the newest snapshot with that date are kept.'''
+    entries = archive.snapshots(url, directory)
+    if snapshot == 'latest':
+        entries = entries[-1:]
+    elif snapshot != 'all':
+        entries = [entry for entry in entries if entry['hash'] == snapshot]
+    if not entries:
+        raise ValueError(f'No archived snapshot {snapshot} of {url}')
+
+    frames = []
+    unmatched = []
+    for entry in entries:
+        df, lines = parse_page(archive.read(entry['hash'], directory),
+                                 fetched=datetime.fromisoformat(entry['fetched']))
+        frames.append(df)
+        unmatched += [dict(line, snapshot=entry['hash']) for line in lines]
+    if len(frames) == 1:
+        return frames[0], unmatched
+
+    df = pd.concat([df.astype({'locations': str, 'occupations': str}).assign(snapshot=number)
+                    for number, df in enumerate(frames)], ignore_index=True)
+    df = df[df['snapshot'] == df.groupby('dates')['snapshot'].transform('max')]
+    return normalize(df.drop(columns='snapshot').sort_values('dates', kind='mergesort')), unmatched
+
+
+def fetch_incremental(url=const.USF_CASES_URL, state=__state):
+    '''Returns the data frame and whether it changed since the last call. The
+    request is conditional and only the sections from the watermark onward are
+    parsed, the rest of the rows are kept from the previous call.'''
+    headers = {}
+    if state['df'] is not None:
+        if state['etag']:
+            headers['If-None-Match'] = state['etag']
+        if state['lastModified']:
+            headers['If-Modified-Since'] = state['lastModified']
+
+    response = fetch_page(url, headers)
+    if response.status_code == 304:
+        return state['df'], False
+
+    newDf, state['unmatched'] = parse_page(response.content, state['watermark'])
+    if state['df'] is None or state['watermark'] is None:
+        df = newDf
+    else:
+        # The watermark section is parsed again in case cases were added to it
+        oldDf = state['df'][~state['df']['dates'].isin(newDf['dates'])]
+        df = normalize(pd.concat([oldDf, newDf], ignore_index=True))
 
+    state['etag'] = response.headers.get('ETag')
+    state['lastModified'] = response.headers.get('Last-Modified')
+    if not df.empty:
+        state['watermark'] = df['dates'].iloc[-1]
+    state['df'] = df
+    return df, True
@@ -0,0 +1,206 @@
+import io
+import threading
+import time
+import uuid
+import pandas as pd
+from sqlalchemy import Column, Date, DateTime, Float, Index, Integer, Text, text
+from sqlalchemy.ext.declarative import declarative_base
+import data
+import constants as const
+
+# Helpers that read and write the covid_data table. They only need an engine, so
+# both the web app and the scheduler use them, as well as a SQLite engine for
+# local testing.
+
+COVID_DATA_COLUMNS = ['dates', 'locations', 'occupations', 'cases']
+
+# Tables of the scraped cases and the predictions. The scheduler creates them
+# with Base.metadata.create_all, the helpers below only need an engine.
+Base = declarative_base()
+
+
+class Predictions(Base):
+    '''Defines a long format table for the predictions of every forecast run'''
+    __tablename__ = 'predictions'
+    __table_args__ = (Index('ix_predictions_location_ds', 'location', 'ds'),)
+
+    run_id = Column(Text, nullable=False, primary_key=True)
+    location = Column(Text, nullable=False, primary_key=True)
+    ds = Column(Date, nullable=False, primary_key=True)
+    yhat = Column(Float, nullable=False)
+    yhat_lower = Column(Float, nullable=False)
+    yhat_upper = Column(Float, nullable=False)
+
+    def __init__(self, run_id, location, ds, yhat, yhat_lower, yhat_upper):
+        self.run_id = run_id
+        self.location = location
+        self.ds = ds
+        self.yhat = yhat
+        self.yhat_lower = yhat_lower
+        self.yhat_upper = yhat_upper
+
+
+class PredictionVersion(Base):
+    '''Defines a single row table with the run id of the current predictions'''
+    __tablename__ = 'prediction_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Text, nullable=False)
+    updated = Column(DateTime, nullable=False)
+
+    def __init__(self, id, version, updated):
+        self.id = id
+        self.version = version
+        self.updated = updated
+
+
+class CovidData(Base):
+    '''Defines a table for the scraped cases and the data types for its columns'''
+    __tablename__ = 'covid_data'
+
+    dates = Column(Date, nullable=False, primary_key=True)
+    locations = Column(Text, nullable=False, primary_key=True)
+    occupations = Column(Text, nullable=False, primary_key=True)
+    cases = Column(Integer, nullable=False)
+
+    def __init__(self, dates, locations, occupations, cases):
+        self.dates = dates
+        self.locations = locations
+        self.occupations = occupations
+        self.cases = cases
+
+
+CREATE_STAGING = '''CREATE TEMPORARY TABLE covid_data_staging (
+    dates DATE NOT NULL,
+    locations TEXT NOT NULL,
+    occupations TEXT NOT NULL,
+    cases INTEGER NOT NULL)'''
+
+# WHERE true keeps SQLite from reading ON CONFLICT as part of the SELECT
+MERGE_STAGING = '''INSERT INTO covid_data (dates, locations, occupations, cases)
+    SELECT dates, locations, occupations, cases FROM covid_data_staging WHERE true
+    ON CONFLICT (dates, locations, occupations) DO UPDATE SET cases = excluded.cases'''
+
+
+def __bulk_insert(connection, table, df):
+    '''Loads the data frame into an existing table with COPY on Postgres and with
+    a multi row insert everywhere else'''
+    if connection.dialect.name == 'postgresql':
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        cursor.copy_expert(f'COPY {table} ({", ".join(df.columns)}) '
+                           'FROM STDIN WITH (FORMAT csv)', buffer)
+    else:
+        df.to_sql(table, con=connection, if_exists='append', index=False,
+                  method='multi', chunksize=500)
+
+
+def upsert_covid_data(engine, df):
+    '''Inserts the rows of a canonical data frame (see data.normalize) into covid_data. Rows that already exist
+    for a date, location and occupation get their number of cases updated.'''
+    df = df[COVID_DATA_COLUMNS].copy()
+    df['dates'] = df['dates'].dt.date
+    with engine.begin() as connection:
+        connection.execute(text('DROP TABLE IF EXISTS covid_data_staging'))
+        connection.execute(text(CREATE_STAGING))
+        __bulk_insert(connection, 'covid_data_staging', df)
+        connection.execute(text(MERGE_STAGING))
+        connection.execute(text('DROP TABLE covid_data_staging'))
+
+
+def read_covid_data(engine):
+    '''Returns the covid_data table as a canonical data frame (see data.normalize)'''
+    with engine.connect() as connection:
+        if not engine.dialect.has_table(connection, 'covid_data'):
+            return data.normalize(pd.DataFrame({'dates': pd.to_datetime([]), 'locations': [],
+                                                'occupations': [], 'cases': []}))
+        df = pd.read_sql_query(text('SELECT dates, locations, occupations, cases FROM covid_data '
+                                    'ORDER BY dates, locations, occupations'), connection)
+    df['dates'] = pd.to_datetime(df['dates'])
+    return data.normalize(df)
+
+
+def write_predictions(engine, forecastDf):
+    '''Stores a by location forecast (see forecasting.forecast) as a new run of the
+    predictions table and points prediction_version at it. The rows are loaded
+    before the pointer moves and the previous run is kept until the next one, so
+    readers always see one complete run.'''
+    runId = uuid.uuid4().hex
+    df = pd.DataFrame({
+        'run_id': runId,
+        'location': forecastDf['locations'].astype(str),
+        'ds': pd.to_datetime(forecastDf['ds']).dt.date,
+        'yhat': forecastDf['yhat'].astype(float),
+        'yhat_lower': forecastDf['yhat_lower'].astype(float),
+        'yhat_upper': forecastDf['yhat_upper'].astype(float),
+    })
+    with engine.begin() as connection:
+        __bulk_insert(connection, 'predictions', df)
+    with engine.begin() as connection:
+        previous = connection.execute(text('SELECT version FROM prediction_version')).scalar()
+        connection.execute(text('DELETE FROM prediction_version'))
+        connection.execute(text('INSERT INTO prediction_version (id, version, updated) '
+                                'VALUES (1, :version, CURRENT_TIMESTAMP)'), dict(version=runId))
+        # A reader that got the previous run id just before the swap still reads
+        # its rows, only older runs are deleted
+        connection.execute(text('DELETE FROM predictions WHERE run_id NOT IN (:version, :previous)'),
+                           dict(version=runId, previous=previous or runId))
+    return runId
+
+
+def read_predictions(connection, runId, location=None):
+    '''Returns the predictions of a run, only for one location when it is given'''
+    query = 'SELECT location, ds, yhat, yhat_lower, yhat_upper FROM predictions WHERE run_id = :run'
+    parameters = dict(run=runId)
+    if location is not None:
+        query += ' AND location = :location'
+        parameters['location'] = location
+    df = pd.read_sql_query(text(query + ' ORDER BY location, ds'), connection, params=parameters)
+    df['ds'] = pd.to_datetime(df['ds'])
+    return df
+
+
+class PredictionCache:
+    '''Keeps the current prediction run in memory. The run pointer written by the
+    scheduler is checked at most once every PREDICTION_CHECK_INTERVAL seconds and
+    the predictions are only read again when it changed.'''
+
+    def __init__(self, get_engine):
+        self.get_engine = get_engine
+        self.version = None
+        self.df = None
+        self.checked = None
+        self.lock = threading.Lock()
+
+    def read_version(self, connection):
+        '''Returns the current run id, None when there is no run yet'''
+        if not self.get_engine().dialect.has_table(connection, 'prediction_version'):
+            return None
+        return connection.execute(text('SELECT version FROM prediction_version')).scalar()
+
+    def get_version(self):
+        '''Returns the current run id, reading the predictions again when it
+        changed since the last check. A failed check is not retried before the
+        next interval either.'''
+        with self.lock:
+            if self.checked is not None and time.monotonic() - self.checked < const.PREDICTION_CHECK_INTERVAL:
+                return self.version
+            try:
+                with self.get_engine().connect() as connection:
+                    version = self.read_version(connection)
+                    if version is None:
+                        # No run yet, the predictions table may not exist either
+                        self.df = None
+                    elif self.df is None or version != self.version:
+                        self.df = read_predictions(connection, version)
+                    self.version = version
+            finally:
+                self.checked = time.monotonic()
+            return self.version
+
+    def get_frame(self):
+        '''Returns the predictions of the current run in long format'''
+        self.get_version()
+        return self.df
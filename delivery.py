@@ -0,0 +1,56 @@
+from collections import OrderedDict
+import gzip
+import json
+import threading
+import flask
+import plotly
+import constants as const
+
+# Brotli is optional, clients get gzip without it
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Json bodies of versioned resources, compressed once per version instead of on
+# every request: (name, version) -> {content encoding: body}
+__bodies = OrderedDict()
+__bodiesLock = threading.Lock()
+
+
+def __get_bodies(name, version, build):
+    key = (name, version)
+    with __bodiesLock:
+        if key in __bodies:
+            __bodies.move_to_end(key)
+            return __bodies[key]
+    content = json.dumps(build(), cls=plotly.utils.PlotlyJSONEncoder).encode()
+    bodies = {'identity': content, 'gzip': gzip.compress(content, const.GZIP_LEVEL)}
+    if brotli is not None:
+        bodies['br'] = brotli.compress(content, quality=const.BROTLI_QUALITY)
+    with __bodiesLock:
+        __bodies[key] = bodies
+        while len(__bodies) > const.DELIVERY_CACHE_SIZE:
+            __bodies.popitem(last=False)
+    return bodies
+
+
+def versioned_response(name, version, build, cacheControl):
+    '''Returns a response with the json of build() for a version of a resource.
+    The ETag is the version, a conditional request for the same version gets a
+    304 without a body. The body is sent with the best compression the client
+    accepts, Flask-Compress leaves responses with a Content-Encoding alone.'''
+    etag = f'{name}-{version}'
+    if flask.request.if_none_match.contains(etag):
+        response = flask.Response(status=304)
+    else:
+        bodies = __get_bodies(name, version, build)
+        encoding = flask.request.accept_encodings.best_match(
+            [e for e in ['br', 'gzip'] if e in bodies], default='identity')
+        response = flask.Response(bodies[encoding], mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cacheControl
+    response.vary.add('Accept-Encoding')
+    return response
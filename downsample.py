@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import constants as const
+
+# Caps the points of long time series traces. Points inside the visible window of
+# a graph are kept, the rest of the history is downsampled with
+# largest-triangle-three-buckets for lines and bucketed means for bars.
+
+
+def lttb(x, y, threshold):
+    '''Returns the indices of the points largest-triangle-three-buckets keeps to
+    draw the line through x and y with threshold points. x and y are numeric numpy
+    arrays, x sorted ascending.'''
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # The first and last points are always kept, the others are split into buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    x = x.astype(float)
+    y = y.astype(float)
+    counts = np.diff(edges)
+    # Average of the bucket after every bucket, after the last one comes the last point
+    nextX = np.append(np.add.reduceat(x[:n - 1], edges[:-1])[1:] / counts[1:], x[-1]).tolist()
+    nextY = np.append(np.add.reduceat(y[:n - 1], edges[:-1])[1:] / counts[1:], y[-1]).tolist()
+    edges = edges.tolist()
+    x, y = x.tolist(), y.tolist()
+    indices = [0]
+    selected = 0
+    # Each bucket depends on the point selected in the previous one, buckets of
+    # daily series hold a few points so plain python beats numpy calls here
+    for i in range(threshold - 2):
+        ax, ay, cx, cy = x[selected], y[selected], nextX[i], nextY[i]
+        largest = -1.0
+        for j in range(edges[i], edges[i + 1]):
+            # Twice the area of the triangle between the selected point, this
+            # point and the average of the next bucket
+            area = abs((ax - cx) * (y[j] - ay) - (ax - x[j]) * (cy - ay))
+            if area > largest:
+                largest, candidate = area, j
+        selected = candidate
+        indices.append(selected)
+    indices.append(n - 1)
+    return np.array(indices)
+
+
+def bucket_means(x, y, threshold):
+    '''Returns x and y with the values averaged into at most threshold buckets,
+    every bucket is placed at its first x. A bucket is drawn as wide as one day,
+    so it shows the mean of its days rather than their sum.'''
+    n = len(y)
+    if threshold >= n or threshold < 1:
+        return x, y
+    starts = np.linspace(0, n, threshold + 1).astype(int)[:-1]
+    counts = np.diff(np.append(starts, n))
+    return x[starts], np.add.reduceat(y, starts) / counts
+
+
+def __split(dates, window):
+    '''Returns the positions where the window starts and ends in the sorted dates'''
+    if window is None:
+        return len(dates), len(dates)
+    return (np.searchsorted(dates, np.datetime64(window[0])),
+            np.searchsorted(dates, np.datetime64(window[1]), side='right'))
+
+
+def __downsample(dates, values, window, threshold, reduce):
+    '''Keeps the points in the window up to threshold and reduces the points before
+    and after it to threshold / 2 each'''
+    start, end = __split(dates, window)
+    parts = [reduce(dates[a:b], values[a:b], limit) for a, b, limit in
+             [(0, start, threshold // 2 if window else threshold), (start, end, threshold),
+              (end, len(dates), threshold // 2)] if b > a]
+    if not parts:
+        return dates, values
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+def __line(dates, values, threshold):
+    indices = lttb(dates.view('int64'), values, threshold)
+    return dates[indices], values[indices]
+
+
+def line(dates, values, window=None, threshold=const.MAX_TRACE_POINTS):
+    '''Returns the dates and values of a line trace with at most about twice
+    threshold points, the points in the window are kept at full resolution'''
+    return __downsample(pd.to_datetime(dates).to_numpy(), np.asarray(values), window,
+                        threshold, __line)
+
+
+def bars(dates, values, window=None, threshold=const.MAX_TRACE_POINTS):
+    '''Returns the dates and values of a bar trace with at most about twice
+    threshold bars, bars outside the window are averaged into buckets'''
+    return __downsample(pd.to_datetime(dates).to_numpy(), np.asarray(values), window,
+                        threshold, bucket_means)
+
+
+def apply_window(layout, window=None, axis_name='xaxis'):
+    '''Sets the x axis range of a layout to the window and returns the window as
+    timestamps. None keeps the default range of the layout and 'all' autoscales
+    the axis, both return None when the whole history is shown.'''
+    axis = layout.setdefault(axis_name, dict())
+    if window == 'all':
+        axis.pop('range', None)
+        axis['autorange'] = True
+        return None
+    if window is None:
+        window = axis.get('range')
+        if window is None:
+            return None
+    else:
+        axis['range'] = list(window)
+    return pd.Timestamp(window[0]), pd.Timestamp(window[1])
+
+
+def get_window(relayoutData):
+    '''Returns the window relayoutData of a graph sets for apply_window, False when
+    it does not change the x axis'''
+    if not relayoutData:
+        return False
+    if relayoutData.get('xaxis.autorange'):
+        return 'all'
+    if 'xaxis.range[0]' in relayoutData and 'xaxis.range[1]' in relayoutData:
+        return relayoutData['xaxis.range[0]'], relayoutData['xaxis.range[1]']
+    if 'xaxis.range' in relayoutData:
+        return tuple(relayoutData['xaxis.range'])
+    return False
@@ -0,0 +1,112 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import numpy as np
+import pandas as pd
+import constants as const
+import helper_functions as hf
+
+# Forecasting backends. Every backend takes a list of ds/y data frames (see
+# helper_functions.format_dfs_for_prediction) and returns a list of data frames
+# with ds, yhat, yhat_lower and yhat_upper for the history and the forecast, None
+# for a series it could not fit.
+FORECASTERS = {}
+PREDICTION_COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+
+def register_forecaster(name):
+    '''Decorator that adds a forecaster class to the forecaster registry'''
+    def decorator(cls):
+        FORECASTERS[name] = cls()
+        return cls
+    return decorator
+
+
+def fit_prophet(series, periods):
+    '''Fits one series in a worker process, returns None when the fit fails so one
+    location with too little data does not stop the others'''
+    try:
+        return hf.get_prediction(series, periods)
+    except Exception as e:
+        print('Forecast failed: ', e)
+        return None
+
+
+@register_forecaster('prophet')
+class ProphetForecaster:
+    '''One Prophet model per series, fitted in parallel in a process pool'''
+
+    def predict(self, series, periods=const.FORECAST_PERIODS, max_workers=const.FORECAST_WORKERS):
+        workers = min(len(series), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(fit_prophet, series, [periods] * len(series)))
+
+
+@register_forecaster('smoothing')
+class SmoothingForecaster:
+    '''Damped trend exponential smoothing in NumPy. All series are fitted at once:
+    they are aligned on one date range and every smoothing step works on a
+    (series x parameters) array. The parameters with the smallest one step ahead
+    error are picked per series from a small grid. The 95% interval comes from the
+    one step ahead errors and widens with the forecast horizon.'''
+
+    ALPHAS = np.array([0.2, 0.4, 0.6, 0.8, 1.0])
+    BETAS = np.array([0.05, 0.1, 0.2, 0.4])
+    PHI = 0.98
+
+    def predict(self, series, periods=const.FORECAST_PERIODS, max_workers=None):
+        dates = pd.date_range(min(s['ds'].min() for s in series), max(s['ds'].max() for s in series))
+        # Cumulative cases are 0 before the first report and stay flat after the last one
+        y = np.stack([s.set_index('ds')['y'].reindex(dates).ffill().fillna(0).to_numpy(float)
+                      for s in series])
+
+        alpha, beta = (grid.ravel()[None, :] for grid in np.meshgrid(self.ALPHAS, self.BETAS))
+        level = np.repeat(y[:, :1], alpha.shape[1], axis=1)
+        trend = np.zeros_like(level)
+        errors = np.zeros_like(level)
+        fitted = np.empty((len(series), alpha.shape[1], y.shape[1]))
+        fitted[:, :, 0] = level
+        for t in range(1, y.shape[1]):
+            prediction = level + self.PHI * trend
+            fitted[:, :, t] = prediction
+            errors += (y[:, t:t + 1] - prediction) ** 2
+            newLevel = alpha * y[:, t:t + 1] + (1 - alpha) * prediction
+            trend = beta * (newLevel - level) + (1 - beta) * self.PHI * trend
+            level = newLevel
+
+        best = errors.argmin(axis=1)
+        rows = np.arange(len(series))
+        level, trend, fitted = level[rows, best], trend[rows, best], fitted[rows, best]
+        sigma = np.sqrt(errors[rows, best] / max(y.shape[1] - 1, 1))
+        damping = np.cumsum(self.PHI ** np.arange(1, periods + 1))
+        future = level[:, None] + damping[None, :] * trend[:, None]
+
+        ds = dates.append(pd.date_range(dates[-1] + pd.Timedelta(days=1), periods=periods))
+        yhat = np.concatenate([fitted, future], axis=1).round().astype(int)
+        horizon = np.concatenate([np.ones(y.shape[1]), np.sqrt(np.arange(1, periods + 1))])
+        width = 1.96 * sigma[:, None] * horizon[None, :]
+        return [pd.DataFrame({'ds': ds, 'yhat': values, 'yhat_lower': values - spread,
+                              'yhat_upper': values + spread})
+                for values, spread in zip(yhat, width)]
+
+
+def forecast(df, by=('locations',), backend=const.FORECAST_BACKEND,
+             periods=const.FORECAST_PERIODS, max_workers=const.FORECAST_WORKERS):
+    '''Fits one model per group of the canonical data frame (see data.normalize)
+    with the chosen backend.
+    Output: long format data frame with the group columns, ds, yhat, yhat_lower
+    and yhat_upper. Raises ValueError when no group could be fitted.'''
+    groups = [(key if isinstance(key, tuple) else (key,), group)
+              for key, group in df.groupby(list(by), observed=True)]
+    if not groups:
+        return pd.DataFrame(columns=list(by) + PREDICTION_COLUMNS)
+    series = hf.format_dfs_for_prediction([group for _, group in groups])
+    results = FORECASTERS[backend].predict(series, periods, max_workers)
+
+    frames = []
+    for (key, _), result in zip(groups, results):
+        if result is not None:
+            frames.append(result.assign(**dict(zip(by, key))))
+    if not frames:
+        raise ValueError(f'The {backend} backend could not fit any of the {len(groups)} series')
+    return pd.concat(frames, ignore_index=True)[list(by) + PREDICTION_COLUMNS]
+
@@ -1,44 +1,61 @@
+import copy
+import functools
 import plotly.graph_objs as go
 import constants as const
 import helper_functions as hf
+import downsample
+
+TRACE_TYPES = dict(bar=go.Bar, scatter=go.Scatter, box=go.Box, pie=go.Pie)
+
+
+def trace(type, **properties):
+    '''Returns a tracer as a plain dict. Plotly only validates the properties when
+    VALIDATE_FIGURES is set, validation dominates building large figures.'''
+    if const.VALIDATE_FIGURES:
+        return TRACE_TYPES[type](**properties).to_plotly_json()
+    return dict(type=type, **properties)
+
 
 # Tracers
-def generate_daily_bar_graph(locationList):
-    '''Return tracers for daily bar graph based on location'''
+def generate_daily_bar_graph(locationList, window=None):
+    '''Return tracers for daily bar graph based on location, days outside the
+    window are averaged into buckets'''
     return [
-        go.Bar(
-            x=location['dates'],
-            y=location['cases'],
+        trace(
+            'bar',
+            x=x,
+            y=y,
             name=name,
-            marker_color=color,
+            marker=dict(color=color),
         )
-        for location, color, name in zip(
-            locationList, const.GENERAL_COLORS, const.CAMPUS_NAMES
+        for (x, y), color, name in zip(
+            [downsample.bars(location['dates'], location['cases'], window) for location in locationList],
+            const.GENERAL_COLORS, const.CAMPUS_NAMES
         )
     ]
 
-def generate_total_scatter(selection, location_list, prediction_list):
-    '''Return tracers for total scatter graphs based on location'''
-    try:
-        tracer_list = []
-        if selection == 'actual':
-            for location, color, name in zip(location_list, const.GENERAL_COLORS, const.CAMPUS_NAMES):
-                location['cases'] = location['cases'].cumsum()
-                tracer_list.append(go.Scatter(
-                    x=location['dates'],
-                    y=location['cases'],
-                    name=name, mode='lines+markers', line=dict(color=color, width=3)))
-        elif selection == 'prediction':
-            for location, color, name, col_name in zip(prediction_list, const.GENERAL_COLORS, const.CAMPUS_NAMES,
-                                                       const.PREDICTION_COL_NAMES):
-                tracer_list.append(go.Scatter(
-                    x=location['DS'],
-                    y=location[col_name],
-                    name=name, mode='lines', line=dict(color=color, width=3)))
-
-        return tracer_list
-    except Exception as e:
-        print(e)
+def generate_total_scatter(location_list, prediction_list, selection='actual'):
+    '''Return tracers for total scatter graphs based on location. The actual and
+    prediction tracers are both returned, their meta is the graph type and only
+    the ones of the selected graph type are visible.'''
+    tracer_list = []
+    for location, color, name in zip(location_list, const.GENERAL_COLORS, const.CAMPUS_NAMES):
+        x, y = downsample.line(location['dates'], location['cases'].cumsum())
+        tracer_list.append(trace(
+            'scatter',
+            x=x,
+            y=y,
+            name=name, mode='lines+markers', line=dict(color=color, width=3),
+            meta='actual', visible=selection == 'actual'))
+    for location, color, name in zip(prediction_list, const.GENERAL_COLORS, const.CAMPUS_NAMES):
+        x, y = downsample.line(location['ds'], location['yhat'])
+        tracer_list.append(trace(
+            'scatter',
+            x=x,
+            y=y,
+            name=name, mode='lines', line=dict(color=color, width=3),
+            meta='prediction', visible=selection == 'prediction'))
+    return tracer_list
 
 
 def generate_employee_student_total_graph(occupationList):
@@ -46,10 +63,11 @@ def generate_employee_student_total_graph(occupationList):
     tracerList = []
     
     for occupation, color, name in zip(occupationList, const.OCCUPATION_COLORS, const.OCCUPATION_NAMES):
-        occupation['cases'] = occupation['cases'].cumsum()
+        x, y = downsample.line(occupation['dates'], occupation['cases'].cumsum())
         tracerList.append(
-            go.Scatter(x=occupation['dates'],
-               y=occupation['cases'],
+            trace('scatter',
+               x=x,
+               y=y,
                name=name,
                mode = 'lines+markers',
                line = dict(color = color, width = 3)
@@ -58,17 +76,20 @@ def generate_employee_student_total_graph(occupationList):
     return tracerList
 
 
-def generate_employee_student_daily_graph(occupationList):
-    '''Return tracers for daily bar graph based on occupation'''
+def generate_employee_student_daily_graph(occupationList, window=None):
+    '''Return tracers for daily bar graph based on occupation, days outside the
+    window are averaged into buckets'''
     return [
-        go.Bar(
-            x=occupation['dates'],
-            y=occupation['cases'],
+        trace(
+            'bar',
+            x=x,
+            y=y,
             name=name,
-            marker_color=color,
+            marker=dict(color=color),
         )
-        for occupation, color, name in zip(
-            occupationList, const.OCCUPATION_COLORS, const.OCCUPATION_NAMES
+        for (x, y), color, name in zip(
+            [downsample.bars(occupation['dates'], occupation['cases'], window) for occupation in occupationList],
+            const.OCCUPATION_COLORS, const.OCCUPATION_NAMES
         )
     ]
 
@@ -76,12 +97,13 @@ def generate_employee_student_daily_graph(occupationList):
 def generate_box_plot(occupationList):
     '''Return tracers for box plot based on occupation'''
     return [
-        go.Box(
-            y=occupation['cases'],
+        trace(
+            'box',
+            y=occupation['cases'].to_numpy(),
             name=name,
             boxpoints='all',
             boxmean=True,
-            marker_color=color,
+            marker=dict(color=color),
         )
         for occupation, color, name in zip(
             occupationList, const.OCCUPATION_COLORS, const.OCCUPATION_NAMES
@@ -91,17 +113,20 @@ def generate_box_plot(occupationList):
 
 def generate_pie_plot(occupationList):
     '''Return tracers for pie plot based on occupation'''
-    values = [occupation['cases'].sum() for occupation in occupationList]
+    values = [int(occupation['cases'].sum()) for occupation in occupationList]
     return [
-        go.Pie(labels=const.OCCUPATION_NAMES,
-               values=values,
-               hole=.3,
-               marker=dict(colors=const.OCCUPATION_COLORS))
+        trace('pie',
+              labels=const.OCCUPATION_NAMES,
+              values=values,
+              hole=.3,
+              marker=dict(colors=const.OCCUPATION_COLORS))
     ]
 
 # Layouts
-def general_graph_layout(title):
-    '''Returns a general layout for a graph'''
+# Templates are built once per title, the functions return copies since callers
+# change the layouts.
+@functools.lru_cache(maxsize=const.LAYOUT_CACHE_SIZE)
+def __general_graph_template(title):
     return dict(title=dict(text=title,
                            font=dict(size=22, color=const.DARK_GREEN)),
                 xaxis=dict(tickfont=dict(size=16)),
@@ -122,9 +147,12 @@ def general_graph_layout(title):
                 #               )
                 )
 
-def generate_bar_layout(title, barmode):
-    '''Returns a layout for a bar graph with the barmode dependent on the 
-    input'''
+def general_graph_layout(title):
+    '''Returns a general layout for a graph'''
+    return copy.deepcopy(__general_graph_template(title))
+
+@functools.lru_cache(maxsize=const.LAYOUT_CACHE_SIZE)
+def __bar_template(title, barmode):
     layout = dict(
         barmode = barmode,
         title=dict(text=title, font=dict(size=22, color=const.DARK_GREEN)),
@@ -137,5 +165,13 @@ def generate_bar_layout(title, barmode):
         legend=dict(bgcolor=const.GREY, font=dict(size=14)),
     )
     
-    hf.add_range_selector(layout, default = '1m')
+    hf.add_range_selector(layout)
+    return layout
+
+def generate_bar_layout(title, barmode, end=None):
+    '''Returns a layout for a bar graph with the barmode dependent on the 
+    input. The default range is the month up to the day end, today by default.'''
+    layout = copy.deepcopy(__bar_template(title, barmode))
+    # The default range ends today, so it is not part of the template
+    hf.add_range_selector(layout, default = '1m', end = end)
     return layout
\ No newline at end of file
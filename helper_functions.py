@@ -1,10 +1,9 @@
 import pandas as pd
 import ast
-from datetime import datetime, timedelta
+from datetime import datetime
 import dash_html_components as html
 from dateutil.relativedelta import relativedelta
 import re
-from fbprophet import Prophet
 import constants as const
 
 
@@ -35,7 +34,10 @@ def create_daily_cases_string(dailyCases):
     '''Returns a string to print for daily cases'''
     text = str(dailyCases['cases'].iloc[-1]) + ' cases (' if dailyCases['cases'].iloc[-1] > 1 else\
         str(dailyCases['cases'].iloc[-1]) + ' case ('
-    return text + str(dailyCases['dates'].iloc[-1]) + ')'
+    date = dailyCases['dates'].iloc[-1]
+    if isinstance(date, datetime):
+        date = f'{date:%B} {date.day} {date.year}'
+    return text + str(date) + ')'
 
 
 def generate_data_table_information(df):
@@ -43,39 +45,39 @@ def generate_data_table_information(df):
     return ([{'name': i, 'id': i} for i in df.columns], df.to_dict('records'))
 
 
+def format_dates(dates):
+    '''Returns a series of datetimes as strings in the format used on the USF page'''
+    return dates.dt.month_name() + ' ' + dates.dt.day.astype(str) + ' ' + dates.dt.year.astype(str)
+
+
 def string_to_df(string):
     '''Helper function that converts a string into a dataframe'''
     if isinstance(string, str):
         return pd.DataFrame(ast.literal_eval(string))
 
 
-def get_percent(df, days=14):
-    '''Helper function that returns percentage of increase in cases in the specified
-    number of days. 
-    Output: result (percentage), status(increase or decrease), mostRecent value,
-    Last updated value.'''
-    lastTenDays = df.groupby('dates', sort=False, as_index=False).sum()
-    lastTenDays['cases'] = lastTenDays['cases'].cumsum()
-    lastTenDays = lastTenDays.tail(days + 1)
-    while True:
-        dayLimit = datetime.strftime(datetime.today() - timedelta(days=days),
-                                     '%Y-%m-%d')
-        if not lastTenDays[lastTenDays['dates'] == dayLimit].empty:
-            lastValue = int(
-                lastTenDays[lastTenDays['dates'] == dayLimit]['cases'])
-            break
-        else:
-            days += 1
-
-    mostRecent = int(lastTenDays['cases'].iloc[-1])
-    result = ((mostRecent - lastValue) / lastValue)
-    status = 'increase'
+def create_trend_string(trend, campus, days=const.TREND_DAYS):
+    '''Returns the overview of the growth of a campus in the last days, trend is
+    the dict of AggregateCube.trend'''
+    lastValue, mostRecent = trend[f'start{days}'], trend['total']
+    period = 'two weeks' if days == 14 else f'{days} days'
+    if pd.isna(trend[f'growth{days}']):
+        return f'The USF {campus} had no cases {period} ago. The number of cases went from {lastValue} to {mostRecent}.'
+    result = trend[f'growth{days}']
+    status = 'increase' if result >= 0 else 'decrease'
+    text = f'The USF {campus} has seen a {abs(result):.2%} {status} in cases in the last {period}. '\
+        f'The number of cases went from {lastValue} to {mostRecent}.'
+    if not pd.isna(trend[f'doubling{days}']):
+        text += f' At this rate the number of cases doubles every {trend[f"doubling{days}"]:.0f} days.'
+    return text
 
-    if result < 0:
-        status = 'decrease'
-        result *= -1
 
-    return result, status, mostRecent, lastValue
+def create_card_trend_string(trend, days=const.TREND_WINDOWS[0]):
+    '''Returns the daily average and growth of the last days for a card'''
+    text = f'{trend[f"average{days}"]:.1f} cases per day'
+    if not pd.isna(trend[f'growth{days}']):
+        text += f' (+{trend[f"growth{days}"]:.1%})'
+    return text
 
 
 def get_daily_average(df):
@@ -86,6 +88,8 @@ def get_daily_average(df):
 
 def create_avg_string(employeeAvg, studentAvg, campus):
     '''returns a string that specifies the daily average for student vs employees'''
+    if pd.isna(employeeAvg) or pd.isna(studentAvg):
+        return f'There are not enough cases yet to compare students and employees at USF {campus}.'
     ratio = studentAvg / employeeAvg
     return f'On average per day, {ratio:.2} times the number of students are tested positive compared to USF {campus} employees.'\
             if(ratio != 1.0) else f'On average per day, the same number of students are tested positive as USF {campus} employees.'
@@ -113,8 +117,9 @@ def generate_collapse(active_tab):
 
 
 
-def add_range_selector(layout, axis_name='xaxis', ranges=None, default=None):    
-    '''Add a rangeselector to the layout if it doesn't already have one.
+def add_range_selector(layout, axis_name='xaxis', ranges=None, default=None, end=None):
+    '''Add a rangeselector to the layout if it doesn't already have one. The
+    default range ends with the day end, now when it is None.
     Based on https://github.com/danio/plotly_tools/blob/master/range.py
     '''
     axis = layout.setdefault(axis_name, dict())
@@ -147,7 +152,7 @@ def add_range_selector(layout, axis_name='xaxis', ranges=None, default=None):
                 stepmode='backward')
     axis.setdefault('rangeselector', dict(buttons=[make_button(r) for r in ranges]))
     if default is not None and default != 'all':
-        end_date = datetime.today()
+        end_date = datetime.today() if end is None else datetime(end.year, end.month, end.day, 23, 59, 59)
         (count, step) = range_split(default)
         step = step_map[step] + 's'
         start_date = (end_date - relativedelta(**{step: count}))
@@ -157,33 +162,28 @@ def add_range_selector(layout, axis_name='xaxis', ranges=None, default=None):
         
         
 def format_dfs_for_prediction(locationList):
+    '''Returns the cumulative cases of every location with a row for each day, in
+    the ds and y columns Prophet expects'''
     dfs = []
     for df in locationList:
-        df = df.groupby('dates', sort=False, as_index=False).sum()
-        df['cases'] = df['cases'].cumsum()
-        df['dates'] = df['dates'].apply(lambda date: datetime.strftime(datetime.strptime(date, '%B %d %Y'), '%Y-%m-%d'))
-        r = pd.date_range(start=df.dates.min(), end=df.dates.max())
-        df = df.set_index('dates')
-        df.index = pd.DatetimeIndex(df.index)
-        df = df.reindex(r).reset_index().fillna(method = 'ffill')
-        df['cases'] = df['cases'].astype(int)
-        df = df.rename(columns = {'index': 'ds', 'cases':'y'})
-        dfs.append(df)  
+        cases = df.groupby('dates')['cases'].sum().cumsum()
+        cases = cases.reindex(pd.date_range(start=cases.index.min(), end=cases.index.max()),
+                              method='ffill')
+        dfs.append(pd.DataFrame({'ds': cases.index, 'y': cases.to_numpy().astype(int)}))
     return dfs
 
-def get_prediction(df):
+def get_prediction(df, periods=const.FORECAST_PERIODS):
     '''Returns a data frame containing a prediction of the # of cases in the specified future period of time'''
+    # Imported here so deployments using another forecasting backend do not need Prophet
+    from fbprophet import Prophet
     m = Prophet()
     m.fit(df)
-    future = m.make_future_dataframe(periods=50)
+    future = m.make_future_dataframe(periods=periods)
     forecast = m.predict(future)
     forecast['yhat'] = forecast['yhat'].apply(lambda x: int(x))
-    return forecast[['ds', 'yhat']]
+    return forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
 
-def get_prediction_by_location(prediction_df):
-    '''Returns a list of prediction data frames based on locations.'''
-    prediction_df = prediction_df.reset_index()
-    return [
-        prediction_df[['DS', col_name]]
-        for col_name in const.PREDICTION_COL_NAMES
-    ]
\ No newline at end of file
+def get_prediction_by_location(prediction_df, locations=const.LOCATION_NAMES):
+    '''Returns a list of prediction data frames based on locations. Locations without
+    a prediction get an empty data frame.'''
+    return [prediction_df[prediction_df['location'] == location] for location in locations]
\ No newline at end of file
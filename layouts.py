@@ -55,6 +55,12 @@ tampaCardContent = [
             id='tampa-card-update',
             className="card-text",
         ),
+        html.H4("Last 7 days", className="card-title"),
+        html.H5(
+            "",
+            id='tampa-card-trend',
+            className="card-text",
+        ),
     ], style = dict(background = 'white', color = 'black')),
 ]
 
@@ -74,6 +80,12 @@ healthCardContent = [
             id='tampa-card-health-update',
             className="card-text",
         ),
+        html.H4("Last 7 days", className="card-title"),
+        html.H5(
+            "",
+            id='tampa-card-health-trend',
+            className="card-text",
+        ),
     ], style = dict(background = 'white', color = 'black')),
 ]
 
@@ -93,6 +105,12 @@ stPeteCardContent = [
             id='st-pete-card-update',
             className="card-text",
         ),
+        html.H4("Last 7 days", className="card-title"),
+        html.H5(
+            "",
+            id='st-pete-card-trend',
+            className="card-text",
+        ),
     ], style = dict(background = 'white', color = 'black')),
 ]
 
@@ -111,6 +129,12 @@ sarasotaCardContent = [
             id='sarasota-card-update',
             className="card-text",
         ),
+        html.H4("Last 7 days", className="card-title"),
+        html.H5(
+            "",
+            id='sarasota-card-trend',
+            className="card-text",
+        ),
     ], style = dict(background = 'white', color = 'black')),
 ]
 
@@ -164,6 +188,10 @@ collapse = html.Div(
 )
 
 EmployeeStudentGraph = html.Div([
+    # Figures of the graphs in the compact encoding, decoded in the browser
+    html.Div([dcc.Store(id=graphId + '-figure') for graphId in [
+        'employee-student-pie', 'employee-student-total-graph',
+        'employee-student-daily-graph', 'employee-student-box']]),
     dcc.Graph(id='employee-student-pie',
               config=dict(displaylogo=False,
                           displayModeBar=False,
@@ -232,8 +260,20 @@ generalTabs = html.Div([
 
 table_layout = html.Div([
         html.H1('Data Table', id = 'table-header', style = dict(color = const.DARK_GREEN, padding = '1rem')),
+        # Paged, sorted and filtered on the server by updateDataTable
         dash_table.DataTable(
             id = 'table',
+            columns = [{'name': column, 'id': column,
+                        'type': 'numeric' if column == 'cases' else 'text'}
+                       for column in const.TABLE_COLUMNS],
+            page_current = 0,
+            page_size = const.TABLE_PAGE_SIZE,
+            page_action = 'custom',
+            sort_action = 'custom',
+            sort_mode = 'single',
+            sort_by = [],
+            filter_action = 'custom',
+            filter_query = '',
             style_header={
                 'backgroundColor': const.GREY,
                 'fontWeight': 'bold',
@@ -278,7 +318,10 @@ USFLayout = html.Div([
                 inline=True,
                 style=dict(marginLeft='4rem', marginTop='1rem'),
             ),
+        # Actual and prediction traces of the total scatter graph, see graph_type
+        dcc.Store(id='total-scatter-graph-figure'),
         totalScatterGraph,
+        dcc.Store(id='daily-bar-graph-figure'),
         dailyBarGraph,
     ])]),
     html.Div([generalTabs], style = dict( background = 'white')),
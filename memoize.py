@@ -0,0 +1,56 @@
+from collections import OrderedDict
+import functools
+import threading
+import constants as const
+
+
+def versioned_lru_cache(maxsize=const.FIGURE_CACHE_SIZE, versions=const.CUBE_VERSIONS):
+    '''Memoizes a function whose first argument has a version attribute, such as an
+    aggregates.AggregateCube. Results are keyed by the version and the other
+    arguments, at most maxsize results are kept and results of versions older than
+    the last few seen are dropped.'''
+    def decorator(function):
+        results = OrderedDict()
+        seenVersions = OrderedDict()
+        stats = dict(hits=0, misses=0)
+        lock = threading.Lock()
+
+        @functools.wraps(function)
+        def wrapper(versioned, *args):
+            key = (versioned.version,) + args
+            with lock:
+                if key in results:
+                    stats['hits'] += 1
+                    results.move_to_end(key)
+                    seenVersions.move_to_end(versioned.version)
+                    return results[key]
+                stats['misses'] += 1
+
+            result = function(versioned, *args)
+
+            with lock:
+                seenVersions[versioned.version] = True
+                seenVersions.move_to_end(versioned.version)
+                while len(seenVersions) > versions:
+                    oldVersion = seenVersions.popitem(last=False)[0]
+                    for oldKey in [k for k in results if k[0] == oldVersion]:
+                        del results[oldKey]
+                results[key] = result
+                while len(results) > maxsize:
+                    results.popitem(last=False)
+            return result
+
+        def cache_info():
+            '''Returns the number of hits, misses and stored results'''
+            with lock:
+                return dict(stats, size=len(results))
+
+        def cache_clear():
+            with lock:
+                results.clear()
+                seenVersions.clear()
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
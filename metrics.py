@@ -0,0 +1,143 @@
+from collections import defaultdict
+import bisect
+import cProfile
+import functools
+import io
+import pstats
+import threading
+import time
+import flask
+from dash.exceptions import PreventUpdate
+import constants as const
+
+# Metrics of the Dash callbacks, rendered in the Prometheus text format at
+# /metrics. Every gunicorn worker keeps its own numbers.
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+SIZE_BUCKETS = [1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216]
+
+__lock = threading.Lock()
+# Cache name -> function returning a dictionary with hits and misses
+__caches = {}
+
+
+class Histogram:
+    '''Cumulative histogram with one series per label value'''
+
+    def __init__(self, name, help, buckets, label):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.label = label
+        self.counts = defaultdict(lambda: [0] * (len(self.buckets) + 1))
+        self.sums = defaultdict(float)
+
+    def observe(self, labelValue, value):
+        self.counts[labelValue][bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[labelValue] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for labelValue, counts in sorted(self.counts.items()):
+            label = f'{self.label}="{labelValue}"'
+            total = 0
+            for bucket, count in zip(self.buckets + ['+Inf'], counts):
+                total += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bucket}"}} {total}')
+            lines.append(f'{self.name}_sum{{{label}}} {self.sums[labelValue]}')
+            lines.append(f'{self.name}_count{{{label}}} {total}')
+        return lines
+
+
+latency = Histogram('dash_callback_latency_seconds', 'Time spent in a Dash callback',
+                    LATENCY_BUCKETS, 'callback')
+requestSize = Histogram('dash_callback_request_bytes', 'Size of the callback request body',
+                        SIZE_BUCKETS, 'callback')
+responseSize = Histogram('dash_callback_response_bytes', 'Size of the callback response body',
+                         SIZE_BUCKETS, 'callback')
+exceptions = defaultdict(int)
+
+
+def count_exception(callback, exception):
+    '''Counts an exception of a callback, also the ones the callback handles itself'''
+    with __lock:
+        exceptions[(callback, type(exception).__name__)] += 1
+
+
+def register_cache(name, info):
+    '''Adds a cache to the metrics, info returns a dictionary with hits and misses'''
+    __caches[name] = info
+
+
+def __log_slow_call(name, elapsed, profile):
+    print(f'Slow callback {name}: {elapsed:.3f}s')
+    if profile is not None:
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats(25)
+        print(stream.getvalue())
+
+
+def instrument(name):
+    '''Decorator that records latency, payload sizes and exceptions of a callback.
+    PreventUpdate is not counted as an exception.'''
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if flask.has_request_context():
+                # Read by record_payload once the response is ready
+                flask.g.callback = name
+            profile = cProfile.Profile() if const.SLOW_CALLBACK_PROFILE else None
+            start = time.perf_counter()
+            try:
+                if profile is not None:
+                    return profile.runcall(function, *args, **kwargs)
+                return function(*args, **kwargs)
+            except PreventUpdate:
+                # Skipped updates are not failures, callbacks that catch a failure
+                # count it themselves before raising PreventUpdate
+                raise
+            except Exception as e:
+                count_exception(name, e)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                with __lock:
+                    latency.observe(name, elapsed)
+                if const.SLOW_CALLBACK_SECONDS is not None and elapsed > const.SLOW_CALLBACK_SECONDS:
+                    __log_slow_call(name, elapsed, profile)
+        return wrapper
+    return decorator
+
+
+def record_payload(response):
+    '''Flask after_request hook that records the payload sizes of callback requests'''
+    name = flask.g.get('callback')
+    if name is not None:
+        with __lock:
+            requestSize.observe(name, flask.request.content_length or 0)
+            if not response.direct_passthrough:
+                responseSize.observe(name, response.calculate_content_length() or 0)
+    return response
+
+
+def render():
+    '''Returns every metric in the Prometheus text format'''
+    with __lock:
+        lines = latency.render() + requestSize.render() + responseSize.render()
+        lines += ['# HELP dash_callback_exceptions_total Exceptions raised in Dash callbacks',
+                  '# TYPE dash_callback_exceptions_total counter']
+        lines += [f'dash_callback_exceptions_total{{callback="{callback}",type="{kind}"}} {count}'
+                  for (callback, kind), count in sorted(exceptions.items())]
+    caches = {name: info() for name, info in __caches.items()}
+    for kind in ['hits', 'misses']:
+        lines += [f'# HELP cache_{kind}_total Cache {kind}', f'# TYPE cache_{kind}_total counter']
+        lines += [f'cache_{kind}_total{{cache="{name}"}} {info[kind]}'
+                  for name, info in sorted(caches.items())]
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(server):
+    '''Adds the /metrics route and the payload hook to the Flask server'''
+    server.after_request(record_payload)
+    server.add_url_rule('/metrics', 'metrics', lambda: flask.Response(
+        render(), mimetype='text/plain; version=0.0.4'))
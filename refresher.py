@@ -0,0 +1,75 @@
+import threading
+import time
+import constants as const
+
+
+class Refresher:
+    '''Rebuilds a snapshot in a background thread every interval seconds, or sooner
+    when refresh is called. Readers always get the last good snapshot without
+    waiting for a rebuild. A failed rebuild keeps the old snapshot and records the
+    error.'''
+
+    def __init__(self, build, interval=const.REFRESH_INTERVAL,
+                 minInterval=const.REFRESH_MIN_INTERVAL, onError=None):
+        self.build = build
+        self.interval = interval
+        self.minInterval = minInterval
+        self.onError = onError
+        # Replaced as a whole, so readers never see a half built snapshot
+        self.snapshot = None
+        self.refreshed = None
+        self.error = None
+        self.failures = 0
+        self.__wake = threading.Event()
+        self.__thread = None
+        self.__lock = threading.Lock()
+
+    def get(self):
+        '''Returns the last good snapshot, None before the first one'''
+        return self.snapshot
+
+    def set(self, snapshot):
+        '''Swaps in a snapshot that was built outside the refresher thread'''
+        self.snapshot = snapshot
+        self.refreshed = time.time()
+
+    def start(self):
+        '''Starts the refresher thread of this process. Threads do not survive the
+        fork of a gunicorn worker, so every worker starts its own on first use.'''
+        with self.__lock:
+            if self.__thread is None or not self.__thread.is_alive():
+                self.__thread = threading.Thread(target=self.__run, name='refresher', daemon=True)
+                self.__thread.start()
+
+    def refresh(self):
+        '''Asks the thread to rebuild the snapshot now. Returns False, without
+        asking, when the last rebuild is less than minInterval seconds old.'''
+        if self.refreshed is not None and time.time() - self.refreshed < self.minInterval:
+            return False
+        self.__wake.set()
+        return True
+
+    def status(self):
+        '''Returns when the snapshot was last rebuilt and the last error'''
+        return dict(refreshed=self.refreshed, error=self.error, failures=self.failures,
+                    running=self.__thread is not None and self.__thread.is_alive())
+
+    def __run(self):
+        # A snapshot set before the thread started is fresh, the first rebuild waits
+        if self.snapshot is not None:
+            self.__wait()
+        while True:
+            try:
+                self.set(self.build())
+                self.failures = 0
+            except Exception as e:
+                self.failures += 1
+                self.error = dict(time=time.time(), error=repr(e))
+                print('Refresh failed, keeping the last snapshot: ', e)
+                if self.onError is not None:
+                    self.onError(e)
+            self.__wait()
+
+    def __wait(self):
+        self.__wake.wait(self.interval)
+        self.__wake.clear()
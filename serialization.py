@@ -0,0 +1,133 @@
+import base64
+import hashlib
+import io
+import json
+import numpy as np
+import pandas as pd
+
+# Codecs used to move a data frame through the dcc.Store.
+# Every codec turns a data frame into a json serializable payload and back.
+CODECS = {}
+DEFAULT_CODEC = 'columnar'
+
+
+def register_codec(name):
+    '''Decorator that adds a codec class to the codec registry'''
+    def decorator(cls):
+        CODECS[name] = cls()
+        return cls
+    return decorator
+
+
+def _to_base64(array):
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode('ascii')
+
+
+def _from_base64(string, dtype):
+    # np.frombuffer shares memory with the decoded bytes instead of copying them
+    return np.frombuffer(base64.b64decode(string), dtype=dtype)
+
+
+@register_codec('columnar')
+class ColumnarCodec:
+    '''Stores numeric and datetime columns as base64 binary arrays and string
+    columns as a list of categories with base64 integer codes.'''
+
+    def encode(self, df):
+        columns = []
+        for name in df.columns:
+            series = df[name]
+            categorical = isinstance(series.dtype, pd.CategoricalDtype)
+            if categorical or not (pd.api.types.is_numeric_dtype(series)
+                                   or pd.api.types.is_datetime64_dtype(series)):
+                if categorical:
+                    # Keep the full list of categories so unobserved ones survive
+                    codes, categories = series.cat.codes.to_numpy(), series.cat.categories
+                else:
+                    codes, categories = pd.factorize(series)
+                # Smallest signed integer that fits the codes, -1 marks missing values
+                codesType = np.dtype(np.min_scalar_type(-len(categories) - 1)).newbyteorder('<')
+                columns.append(dict(name=name, kind='category', categorical=categorical,
+                                    categories=[str(c) for c in categories],
+                                    dtype=codesType.str,
+                                    codes=_to_base64(codes.astype(codesType))))
+            else:
+                values = series.to_numpy()
+                columns.append(dict(name=name, kind='array', dtype=values.dtype.str,
+                                    data=_to_base64(values)))
+        return dict(length=len(df), columns=columns)
+
+    def decode(self, payload):
+        data = {}
+        for column in payload['columns']:
+            if column['kind'] == 'category':
+                values = pd.Categorical.from_codes(_from_base64(column['codes'], column['dtype']),
+                                                   column['categories'])
+                data[column['name']] = values if column['categorical'] else np.asarray(values)
+            else:
+                data[column['name']] = _from_base64(column['data'], column['dtype'])
+        return pd.DataFrame(data, index=pd.RangeIndex(payload['length']))
+
+
+@register_codec('split')
+class SplitCodec:
+    '''Plain json in the split orientation with iso dates, kept for readability
+    when debugging. The dtypes and categories are stored next to the json, which
+    does not keep them.'''
+
+    def encode(self, df):
+        categories = {name: [str(c) for c in df[name].cat.categories] for name in df.columns
+                      if isinstance(df[name].dtype, pd.CategoricalDtype)}
+        return dict(frame=df.to_json(orient='split', index=False, date_format='iso'),
+                    dtypes={name: str(dtype) for name, dtype in df.dtypes.items()},
+                    categories=categories)
+
+    def decode(self, payload):
+        df = pd.read_json(io.StringIO(payload['frame']), orient='split',
+                          convert_dates=False, dtype=False)
+        for name, dtype in payload['dtypes'].items():
+            if name in payload['categories']:
+                df[name] = pd.Categorical(df[name], categories=payload['categories'][name])
+            elif dtype.startswith('datetime64'):
+                df[name] = pd.to_datetime(df[name]).astype(dtype)
+            else:
+                df[name] = df[name].astype(dtype)
+        return df
+
+
+try:
+    import pyarrow as pa
+
+    @register_codec('arrow')
+    class ArrowCodec:
+        '''Arrow IPC stream in base64. Only available when pyarrow is installed.'''
+
+        def encode(self, df):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return base64.b64encode(sink.getvalue().to_pybytes()).decode('ascii')
+
+        def decode(self, payload):
+            reader = pa.ipc.open_stream(pa.py_buffer(base64.b64decode(payload)))
+            return reader.read_all().to_pandas()
+except ImportError:
+    pass
+
+
+def get_version(df):
+    '''Returns a content hash of the data frame that changes whenever the data changes'''
+    digest = hashlib.sha1(json.dumps([str(c) for c in df.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def encode(df, codec=DEFAULT_CODEC):
+    '''Returns the content of a dcc.Store for the data frame'''
+    return dict(codec=codec, version=get_version(df), payload=CODECS[codec].encode(df))
+
+
+def decode(store):
+    '''Returns the data frame held in a dcc.Store created by encode'''
+    return CODECS[store['codec']].decode(store['payload'])
@@ -0,0 +1,207 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+import threading
+import time
+from bs4 import BeautifulSoup, SoupStrainer
+import pandas as pd
+import archive
+import constants as const
+import data
+
+# Case pages the scraper reads. Every source adapter declares the url of its page
+# and the rules that turn the page into canonical rows (see data.normalize).
+SOURCES = {}
+
+# One semaphore per host limits the connections to it, whatever the number of
+# sources on the host
+__hostLimits = {}
+__hostLimitsLock = threading.Lock()
+
+# Names of the sources with a fetch running. A fetch that timed out keeps running
+# after fetch_all returned, the next refresh skips its source until it ends
+# instead of fetching it a second time into the same state.
+__inFlight = set()
+__inFlightLock = threading.Lock()
+
+
+def register_source(source):
+    '''Adds a source adapter to the source registry and returns it'''
+    SOURCES[source.name] = source
+    return source
+
+
+def __host_limit(url):
+    host = urlparse(url).netloc
+    with __hostLimitsLock:
+        if host not in __hostLimits:
+            __hostLimits[host] = threading.BoundedSemaphore(const.HOST_CONNECTIONS)
+        return __hostLimits[host]
+
+
+class Source:
+    '''Base class of the source adapters. fetch makes a conditional request for the
+    page and parses it when it changed, the rows of the last good fetch are kept in
+    state.'''
+
+    def __init__(self, name, url):
+        self.name = name
+        self.url = url
+        self.state = dict(etag=None, lastModified=None, watermark=None, df=None, unmatched=[])
+
+    def parse(self, content):
+        '''Returns the canonical data frame of the page content'''
+        raise NotImplementedError
+
+    def replay(self):
+        '''Returns the canonical data frame of the newest archived snapshot'''
+        entries = archive.snapshots(self.url)
+        if not entries:
+            raise ValueError(f'No archived snapshot of {self.url}')
+        return self.parse(archive.read(entries[-1]['hash']))
+
+    def fetch(self):
+        '''Returns the canonical data frame of the source and whether it changed'''
+        if const.OFFLINE:
+            # Archived snapshots are parsed once instead of fetching the page
+            if self.state['df'] is None:
+                self.state['df'] = self.replay()
+                return self.state['df'], True
+            return self.state['df'], False
+        headers = {}
+        if self.state['df'] is not None:
+            if self.state['etag']:
+                headers['If-None-Match'] = self.state['etag']
+            if self.state['lastModified']:
+                headers['If-Modified-Since'] = self.state['lastModified']
+        response = data.fetch_page(self.url, headers)
+        if response.status_code == 304:
+            return self.state['df'], False
+        df = self.parse(response.content)
+        self.state.update(etag=response.headers.get('ETag'),
+                          lastModified=response.headers.get('Last-Modified'), df=df)
+        return df, True
+
+
+class USFSource(Source):
+    '''The USF cases page, a list of bullets under a heading for every date. Only
+    the sections from the newest date of the last fetch onward are parsed.'''
+
+    def parse(self, content):
+        return data.parse_page(content)[0]
+
+    def replay(self):
+        '''Returns the history rebuilt from every archived snapshot'''
+        return data.replay(self.url)[0]
+
+    def fetch(self):
+        if const.OFFLINE:
+            return super().fetch()
+        return data.fetch_incremental(self.url, self.state)
+
+
+class TableSource(Source):
+    '''A page with an html table of cases with a row per date, location and
+    occupation.
+
+    columns maps the canonical columns (dates, locations, occupations, cases) to
+    the headers of the table. A page without a location or occupation column gets
+    the fixed location or occupation instead. aliases maps the values on the page
+    to canonical names, such as 'Faculty/Staff' to 'Employee'.'''
+
+    def __init__(self, name, url, columns, dateFormat='%Y-%m-%d', location=None,
+                 occupation=None, aliases=None, tableAttrs=None):
+        super().__init__(name, url)
+        self.columns = columns
+        self.dateFormat = dateFormat
+        self.fixed = dict(locations=location, occupations=occupation)
+        self.aliases = aliases or {}
+        self.strainer = SoupStrainer('table', tableAttrs or {})
+
+    def parse(self, content):
+        soup = BeautifulSoup(content, data.HTML_PARSER, parse_only=self.strainer)
+        table = soup.find('table')
+        if table is None:
+            raise ValueError(f'{self.name}: no table on {self.url}')
+        headers = [th.get_text(strip=True) for th in table.find_all('th')]
+        rows = [[td.get_text(strip=True) for td in tr.find_all('td')] for tr in table.find_all('tr')]
+        page = pd.DataFrame([row for row in rows if len(row) == len(headers)], columns=headers)
+
+        df = pd.DataFrame({
+            'dates': pd.to_datetime(page[self.columns['dates']], format=self.dateFormat),
+            'cases': pd.to_numeric(page[self.columns['cases']].str.replace(',', '')),
+        })
+        for column in ['locations', 'occupations']:
+            if self.fixed[column] is not None:
+                df[column] = self.fixed[column]
+            else:
+                df[column] = page[self.columns[column]].replace(self.aliases)
+        df = df.groupby(['dates', 'locations', 'occupations'], as_index=False)['cases'].sum()
+        return data.normalize(df)
+
+
+register_source(USFSource('usf', const.USF_CASES_URL))
+
+
+def __claim(name):
+    '''Marks a source as being fetched, returns False when it already is'''
+    with __inFlightLock:
+        if name in __inFlight:
+            return False
+        __inFlight.add(name)
+        return True
+
+
+def __fetch(source):
+    '''Fetches a source within the connection limit of its host'''
+    try:
+        with __host_limit(source.url):
+            start = time.perf_counter()
+            df, changed = source.fetch()
+            return df, changed, time.perf_counter() - start
+    finally:
+        with __inFlightLock:
+            __inFlight.discard(source.name)
+
+
+def merge(frames):
+    '''Returns the canonical data frames of several sources as one, ordered by date'''
+    frames = [df for df in frames if df is not None]
+    if not frames:
+        return data.normalize(pd.DataFrame(columns=['dates', 'locations', 'occupations', 'cases']))
+    df = pd.concat([df.astype({'locations': str, 'occupations': str}) for df in frames],
+                   ignore_index=True)
+    return data.normalize(df.sort_values('dates', kind='mergesort'))
+
+
+def fetch_all(sources=None, max_workers=const.SOURCE_WORKERS, timeout=const.REFRESH_TIMEOUT):
+    '''Fetches every source concurrently, so a refresh takes as long as the slowest
+    source. Returns the merged data frame, whether any source changed and the
+    errors of the sources that failed or did not answer within timeout seconds.
+    Failed sources contribute the rows of their last good fetch.'''
+    sources = SOURCES if sources is None else sources
+    errors = {}
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(sources)) or 1)
+    futures = {}
+    for name, source in sources.items():
+        if __claim(source.name):
+            futures[executor.submit(__fetch, source)] = name
+        else:
+            errors[name] = RuntimeError('the previous fetch is still running')
+    done, notDone = wait(futures, timeout=timeout)
+    # Sources that are still running keep their thread, nobody waits for them
+    executor.shutdown(wait=False)
+
+    changed = False
+    for future in done:
+        name = futures[future]
+        try:
+            changed |= future.result()[1]
+        except Exception as e:
+            errors[name] = e
+    for future in notDone:
+        errors[futures[future]] = TimeoutError(f'no answer within {timeout} seconds')
+    for name, error in errors.items():
+        print(f'Source {name} failed: ', error)
+
+    df = merge([source.state['df'] for source in sources.values()])
+    return df, changed, errors
@@ -0,0 +1,116 @@
+import math
+import operator
+import re
+import numpy as np
+import pandas as pd
+import constants as const
+import helper_functions as hf
+
+# A part of a DataTable filter query such as {cases} >= 3 or {locations} contains "Tampa",
+# parts are joined with &&. See https://dash.plotly.com/datatable/callbacks
+FILTER_REGEX = re.compile(
+    r'\{(?P<column>[^}]+)\}\s*'
+    r'(?P<operator>[is]?(?:eq|ne|lt|le|gt|ge|contains|datestartswith)\b|!=|<=|>=|=|<|>)\s*'
+    r'(?P<value>.*)')
+SYMBOLS = {'=': 'eq', '!=': 'ne', '<': 'lt', '<=': 'le', '>': 'gt', '>=': 'ge'}
+COMPARISONS = {
+    'eq': operator.eq, 'ne': operator.ne, 'lt': operator.lt,
+    'le': operator.le, 'gt': operator.gt, 'ge': operator.ge,
+}
+
+
+def unquote(value):
+    '''Returns the value of a filter without the quotes around it'''
+    value = value.strip()
+    if len(value) > 1 and value[0] == value[-1] and value[0] in '"\'`':
+        return value[1:-1]
+    return value
+
+
+class TableIndex:
+    '''Rows of the data table with the sort orders of every column computed once per
+    data version. A request filters and slices the rows and only the rows of the
+    requested page are converted to records.'''
+
+    def __init__(self, df):
+        '''df is a canonical data frame, see data.normalize. Rows are kept newest
+        first like on the USF page.'''
+        df = df.iloc[::-1].reset_index(drop=True)
+        self.size = len(df)
+        self.values = {
+            'dates': df['dates'],
+            'locations': df['locations'].astype(str),
+            'occupations': df['occupations'].astype(str),
+            'cases': df['cases'],
+        }
+        # What the table shows, used by the text operators
+        self.text = {
+            'dates': hf.format_dates(df['dates']),
+            'locations': self.values['locations'],
+            'occupations': self.values['occupations'],
+            'cases': df['cases'].astype(str),
+        }
+        self.isoDates = df['dates'].dt.strftime('%Y-%m-%d')
+        self.recordColumns = [self.text[column].to_numpy(dtype=object) for column in
+                                ['dates', 'locations', 'occupations']] + [df['cases'].to_numpy()]
+        self.orders = {}
+        for column, values in self.values.items():
+            codes = pd.factorize(values, sort=True)[0]
+            # Stable sorts keep the newest rows first among equal values
+            self.orders[column] = dict(asc=np.argsort(codes, kind='mergesort'),
+                                       desc=np.argsort(-codes, kind='mergesort'))
+
+    def __match(self, column, op, value):
+        '''Returns a boolean mask of the rows matching one part of a filter query'''
+        op = SYMBOLS.get(op, op)
+        # The i and s prefixes make an operator case insensitive or sensitive
+        insensitive = op[0] == 'i'
+        if op[0] in 'is':
+            op = op[1:]
+        value = unquote(value)
+
+        if op == 'contains':
+            return self.text[column].str.contains(value, case=not insensitive, regex=False).to_numpy()
+        if op == 'datestartswith':
+            return self.isoDates.str.startswith(value).to_numpy()
+
+        values = self.values[column]
+        try:
+            if column == 'cases':
+                value = float(value)
+            elif column == 'dates':
+                value = pd.Timestamp(value)
+        except ValueError:
+            # Dates can also be compared the way the table shows them
+            if column != 'dates' or op not in ['eq', 'ne']:
+                return np.zeros(self.size, dtype=bool)
+            values = self.text[column]
+        if insensitive and isinstance(value, str):
+            values, value = values.str.lower(), value.lower()
+        return COMPARISONS[op](values, value).to_numpy()
+
+    def filter(self, query):
+        '''Returns a boolean mask of the rows matching a filter query, parts that
+        cannot be parsed are ignored'''
+        mask = np.ones(self.size, dtype=bool)
+        for part in query.split(' && '):
+            match = FILTER_REGEX.fullmatch(part.strip())
+            if match is not None and match['column'] in self.values:
+                mask &= self.__match(match['column'], match['operator'], match['value'])
+        return mask
+
+    def records(self, rows):
+        '''Returns the rows as DataTable records'''
+        return [dict(zip(const.TABLE_COLUMNS, row))
+                for row in zip(*[values[rows].tolist() for values in self.recordColumns])]
+
+    def page(self, pageCurrent, pageSize, sortBy=None, filterQuery=None):
+        '''Returns the records of a page and the number of pages for the
+        page_current, page_size, sort_by and filter_query of a DataTable'''
+        order = np.arange(self.size)
+        if sortBy and sortBy[0]['column_id'] in self.orders:
+            order = self.orders[sortBy[0]['column_id']][sortBy[0]['direction']]
+        if filterQuery:
+            order = order[self.filter(filterQuery)[order]]
+        pageCount = max(1, math.ceil(len(order) / pageSize))
+        return self.records(order[pageCurrent * pageSize:(pageCurrent + 1) * pageSize]), pageCount
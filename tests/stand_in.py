@@ -0,0 +1,60 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+
+class StandIn:
+    '''Local HTTP server that stands in for the case pages. pages maps a path to a
+    dict with the body and optionally the status, an ETag and a delay in seconds.
+    A request whose If-None-Match matches the ETag gets a 304. The headers of
+    every request are kept in requests.'''
+
+    def __init__(self, pages=None):
+        self.pages = pages or {}
+        self.requests = []
+        standIn = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                standIn.requests.append((self.path, dict(self.headers)))
+                page = standIn.pages.get(self.path, dict(status=404, body=b''))
+                time.sleep(page.get('delay', 0))
+                etag = page.get('etag')
+                if etag is not None and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(page.get('status', 200))
+                if etag is not None:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(page['body'])))
+                self.end_headers()
+                self.wfile.write(page['body'])
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.server.server_port}{path}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def usf_page(sections):
+    '''Returns a USF style cases page. sections is a list of (heading, bullets)
+    pairs, newest first, as on the page.'''
+    body = ''.join(f'<h3>{heading}</h3><ul>{"".join(f"<li>{bullet}</li>" for bullet in bullets)}</ul>'
+                   for heading, bullets in sections)
+    return f'<html><body><div class="article-body">{body}</div></body></html>'.encode()
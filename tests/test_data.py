@@ -0,0 +1,69 @@
+import unittest
+from unittest import mock
+import pandas as pd
+import constants as const
+import data
+from tests.stand_in import StandIn, usf_page
+
+SECTIONS = [
+    ('September 3', ['Two Tampa students', 'One St. Petersburg employee']),
+    ('September 2', ['One Tampa employee']),
+    ('September 1', ['Three Tampa students']),
+]
+# A new section is added on top and a case is added to the newest section
+CHANGED_SECTIONS = [
+    ('September 4', ['One Sarasota-Manatee student', 'Four Tampa students']),
+    ('September 3', ['Two Tampa students', 'One St. Petersburg employee', 'One Tampa employee']),
+] + SECTIONS[1:]
+
+
+def sorted_rows(df):
+    return df.sort_values(['dates', 'locations', 'occupations']).reset_index(drop=True)
+
+
+class FetchIncrementalTest(unittest.TestCase):
+    '''fetch_incremental against a local HTTP stand-in for the USF page'''
+
+    def setUp(self):
+        self.standIn = StandIn({'/cases': dict(body=usf_page(SECTIONS), etag='"1"')}).__enter__()
+        self.addCleanup(self.standIn.__exit__)
+        # Nothing is written to the page archive of the working directory
+        patcher = mock.patch.object(const, 'ARCHIVE_PAGES', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = self.standIn.url('/cases')
+        self.state = dict(etag=None, lastModified=None, watermark=None, df=None, unmatched=[])
+
+    def test_first_fetch_parses_the_whole_page(self):
+        df, changed = data.fetch_incremental(self.url, self.state)
+        self.assertTrue(changed)
+        pd.testing.assert_frame_equal(df, data.parse_page(usf_page(SECTIONS))[0])
+        self.assertEqual(self.state['etag'], '"1"')
+        self.assertEqual(self.state['watermark'], pd.Timestamp(df['dates'].max()))
+        self.assertNotIn('If-None-Match', self.standIn.requests[0][1])
+
+    def test_unchanged_page_is_not_parsed_again(self):
+        first, _ = data.fetch_incremental(self.url, self.state)
+        with mock.patch.object(data, 'parse_page') as parse_page:
+            df, changed = data.fetch_incremental(self.url, self.state)
+        self.assertFalse(changed)
+        self.assertIs(df, first)
+        parse_page.assert_not_called()
+        self.assertEqual(self.standIn.requests[1][1].get('If-None-Match'), '"1"')
+
+    def test_changed_page_parses_from_the_watermark(self):
+        data.fetch_incremental(self.url, self.state)
+        page = usf_page(CHANGED_SECTIONS)
+        self.standIn.pages['/cases'] = dict(body=page, etag='"2"')
+        with mock.patch.object(data, 'parse_bullets', wraps=data.parse_bullets) as parse_bullets:
+            df, changed = data.fetch_incremental(self.url, self.state)
+        self.assertTrue(changed)
+        self.assertEqual(self.state['etag'], '"2"')
+        # Only the new section and the watermark section are parsed
+        texts = parse_bullets.call_args[0][0]
+        self.assertListEqual(texts, CHANGED_SECTIONS[0][1] + CHANGED_SECTIONS[1][1])
+        pd.testing.assert_frame_equal(sorted_rows(df), sorted_rows(data.parse_page(page)[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine
+import data
+import database
+
+
+def canonical_df(rows):
+    '''Returns a canonical data frame of (date, location, occupation, cases) rows'''
+    df = pd.DataFrame(rows, columns=database.COVID_DATA_COLUMNS)
+    df['dates'] = pd.to_datetime(df['dates'])
+    return data.normalize(df)
+
+
+class CovidDataTest(unittest.TestCase):
+    '''upsert_covid_data and read_covid_data on an in memory SQLite engine'''
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        # The tables of the models the scheduler creates, with their keys
+        database.Base.metadata.create_all(self.engine)
+
+    def test_read_without_table(self):
+        df = database.read_covid_data(create_engine('sqlite://'))
+        self.assertTrue(df.empty)
+        self.assertListEqual(list(df.columns), database.COVID_DATA_COLUMNS)
+
+    def test_covid_data_key(self):
+        key = [column.name for column in database.CovidData.__table__.primary_key]
+        self.assertListEqual(key, ['dates', 'locations', 'occupations'])
+
+    def test_upsert_inserts_rows(self):
+        rows = [('2020-09-01', 'Tampa', 'Student', 3),
+                ('2020-09-01', 'Tampa', 'Employee', 1),
+                ('2020-09-02', 'St. Pete', 'Student', 2)]
+        database.upsert_covid_data(self.engine, canonical_df(rows))
+        df = database.read_covid_data(self.engine)
+        pd.testing.assert_frame_equal(df, canonical_df(sorted(rows)))
+
+    def test_upsert_updates_existing_rows(self):
+        database.upsert_covid_data(self.engine, canonical_df([
+            ('2020-09-01', 'Tampa', 'Student', 3),
+            ('2020-09-02', 'Tampa', 'Student', 5)]))
+        database.upsert_covid_data(self.engine, canonical_df([
+            ('2020-09-02', 'Tampa', 'Student', 7),
+            ('2020-09-03', 'Health', 'Employee', 1)]))
+        df = database.read_covid_data(self.engine)
+        pd.testing.assert_frame_equal(df, canonical_df([
+            ('2020-09-01', 'Tampa', 'Student', 3),
+            ('2020-09-02', 'Tampa', 'Student', 7),
+            ('2020-09-03', 'Health', 'Employee', 1)]))
+
+
+if __name__ == '__main__':
+    unittest.main()
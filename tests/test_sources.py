@@ -0,0 +1,88 @@
+import time
+import unittest
+from unittest import mock
+import constants as const
+import sources
+from tests.stand_in import StandIn, usf_page
+
+USF_PAGE = usf_page([
+    ('September 2', ['Two Tampa students', 'One St. Petersburg employee']),
+    ('September 1', ['One Tampa employee']),
+])
+
+TABLE_PAGE = b'''<html><body><table>
+<tr><th>Date</th><th>Campus</th><th>Group</th><th>Cases</th></tr>
+<tr><td>2020-09-01</td><td>Lakeland</td><td>Faculty/Staff</td><td>3</td></tr>
+<tr><td>2020-09-02</td><td>Lakeland</td><td>Student</td><td>1,204</td></tr>
+</table></body></html>'''
+
+
+def table_source(name, url):
+    return sources.TableSource(name, url, columns=dict(dates='Date', locations='Campus',
+                                                       occupations='Group', cases='Cases'),
+                               aliases={'Faculty/Staff': 'Employee'})
+
+
+class FetchAllTest(unittest.TestCase):
+    '''fetch_all against a local HTTP stand-in for the case pages'''
+
+    def setUp(self):
+        self.standIn = StandIn({'/usf': dict(body=USF_PAGE), '/table': dict(body=TABLE_PAGE),
+                                '/slow': dict(body=TABLE_PAGE, delay=1)}).__enter__()
+        self.addCleanup(self.standIn.__exit__)
+        # Nothing is written to the page archive of the working directory
+        patcher = mock.patch.object(const, 'ARCHIVE_PAGES', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sources_are_merged(self):
+        registry = {'usf': sources.USFSource('usf', self.standIn.url('/usf')),
+                    'table': table_source('table', self.standIn.url('/table'))}
+        df, changed, errors = sources.fetch_all(registry)
+        self.assertTrue(changed)
+        self.assertDictEqual(errors, {})
+        self.assertEqual(df['cases'].sum(), 2 + 1 + 1 + 3 + 1204)
+        self.assertTrue(df['dates'].is_monotonic_increasing)
+        lakeland = df[df['locations'] == 'Lakeland'].set_index('occupations')['cases']
+        self.assertEqual(lakeland['Employee'], 3)
+
+    def test_usf_source_declares_its_parse(self):
+        source = sources.USFSource('usf', self.standIn.url('/usf'))
+        self.assertEqual(source.parse(USF_PAGE)['cases'].sum(), 4)
+
+    def test_failed_source_keeps_its_last_rows(self):
+        registry = {'table': table_source('table', self.standIn.url('/table'))}
+        sources.fetch_all(registry)
+        self.standIn.pages['/table'] = dict(status=404, body=b'')
+        df, changed, errors = sources.fetch_all(registry)
+        self.assertFalse(changed)
+        self.assertListEqual(list(errors), ['table'])
+        self.assertEqual(df['cases'].sum(), 3 + 1204)
+
+    def test_slow_source_times_out_and_is_skipped_while_running(self):
+        registry = {'table': table_source('table', self.standIn.url('/table')),
+                    'slow': table_source('slow', self.standIn.url('/slow'))}
+        start = time.perf_counter()
+        df, changed, errors = sources.fetch_all(registry, timeout=0.3)
+        self.assertLess(time.perf_counter() - start, 0.9)
+        self.assertIsInstance(errors['slow'], TimeoutError)
+        self.assertNotIn('table', errors)
+        self.assertEqual(df['cases'].sum(), 3 + 1204)
+
+        # The timed out fetch is still running, the next refresh skips the source
+        df, changed, errors = sources.fetch_all(registry, timeout=0.3)
+        self.assertIsInstance(errors['slow'], RuntimeError)
+        self.assertEqual(sum(path == '/slow' for path, _ in self.standIn.requests), 1)
+
+        deadline = time.monotonic() + 5
+        while registry['slow'].state['df'] is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        # The source is released right after its state is stored
+        time.sleep(0.2)
+        df, changed, errors = sources.fetch_all(registry, timeout=3)
+        self.assertDictEqual(errors, {})
+        self.assertEqual(df['cases'].sum(), 2 * (3 + 1204))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import constants as const
+
+# Growth, rolling averages and doubling times of the cases of every location and
+# occupation, computed in one pass over a calendar of days. Days without a report
+# are days without cases, so a window of n days always starts n calendar days
+# before its end, however irregular the reporting dates are.
+
+# Occupation of the rows with the sum of every occupation of a location
+ALL = 'All'
+
+
+def compute(daily, end=None, windows=const.TREND_WINDOWS):
+    '''Returns the trends of a daily cases series indexed by (locations,
+    occupations, dates), as of end, the last reported date by default. Anchored on
+    the data instead of the clock, the trends hold for as long as the data version.
+    The frame has a row per (location, occupation), with occupation ALL for the
+    whole location, and for every window n of days the columns:
+        start<n>: cumulative cases n days before end
+        growth<n>: growth of the cumulative cases over the window, NaN without
+            cases at its start
+        average<n>: daily average of the cases in the window
+        doubling<n>: days the cumulative cases take to double at the growth rate
+            of the window, NaN without growth
+    and total, the cumulative cases at end, and latest, the last reported date.'''
+    daily = daily.astype('int64')
+    wide = daily.unstack(['locations', 'occupations'], fill_value=0)
+    if wide.empty:
+        return pd.DataFrame(index=pd.MultiIndex.from_tuples([], names=['locations', 'occupations']))
+    wide.columns = wide.columns.remove_unused_levels()
+    byLocation = wide.T.groupby(level='locations', observed=True).sum().T
+    byLocation.columns = pd.MultiIndex.from_product([byLocation.columns, [ALL]],
+                                                    names=['locations', 'occupations'])
+    wide = pd.concat([wide, byLocation], axis=1)
+    wide.columns = wide.columns.set_levels(wide.columns.levels[1].astype(str), level=1)
+    latest = wide.ne(0).cumsum().idxmax()
+
+    end = wide.index.max() if end is None else max(pd.Timestamp(end), wide.index.max())
+    # Reaches back a full window before the first report, so every window has a start
+    calendar = pd.date_range(wide.index.min() - pd.Timedelta(days=max(windows)), end, freq='D')
+    wide = wide.reindex(calendar, fill_value=0)
+    cumulative = wide.cumsum()
+
+    trends = pd.DataFrame({'total': cumulative.iloc[-1], 'latest': latest})
+    for n in windows:
+        start = cumulative.shift(n).iloc[-1]
+        growth = cumulative.iloc[-1] / start.where(start > 0) - 1
+        trends[f'start{n}'] = start.astype('int64')
+        trends[f'growth{n}'] = growth
+        trends[f'average{n}'] = wide.rolling(n).mean().iloc[-1]
+        trends[f'doubling{n}'] = n * np.log(2) / np.log1p(growth.where(growth > 0))
+    trends.index.names = ['locations', 'occupations']
+    return trends.sort_index()